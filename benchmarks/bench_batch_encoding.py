@@ -0,0 +1,59 @@
+"""
+file size and load time of a batch config in each encoding:
+
+    - full : every run config in full (the encoding before `shared_config`)
+    - shared : `index_only=False`, fields shared by every run stored once
+    - index : `index_only=True`, only the index of the runs (configs loaded on demand)
+
+usage: python benchmarks/bench_batch_encoding.py [n_runs]
+"""
+import sys
+import json
+import time
+import pathlib
+import tempfile
+
+from ipyrun.runsave import flush_configs
+from ipyrun.examples.linegraph.linegraph_app import (
+    LineGraphConfigShell,
+    LineGraphConfigBatch,
+)
+
+
+def make_batch(fdir_root, n):
+    cb = LineGraphConfigBatch(fdir_root=fdir_root, index_only=False)
+    cb.configs = [LineGraphConfigShell(index=i, fdir_root=fdir_root) for i in range(n)]
+    return cb
+
+
+def time_load(text, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        LineGraphConfigBatch(**json.loads(text))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n=1000):
+    fdir = pathlib.Path(tempfile.mkdtemp())
+    cb = make_batch(fdir, n)
+    full = cb.model_dump(mode="json")
+    full["shared_config"] = {}
+    full["configs"] = [c.model_dump(mode="json") for c in cb.configs]
+    texts = {"full": json.dumps(full, indent=4)}
+    texts["shared"] = cb.model_dump_json(indent=4)
+    cb.index_only = True
+    for c in cb.configs:  # the run files read on demand
+        c.file(c.fpth_config)
+    texts["index"] = cb.model_dump_json(indent=4)
+    flush_configs()
+
+    print(f"{n} runs")
+    print(f"{'encoding':<10}{'size (kB)':>12}{'load (s)':>12}")
+    for k, text in texts.items():
+        print(f"{k:<10}{len(text.encode()) / 1000:>12.1f}{time_load(text):>12.3f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,52 @@
+"""
+validation time per DefaultConfigShell with and without the compiled template and
+rendered shell caches (see `ipyrun.runshell.ShellRenderer`).
+
+    - uncached : template compiled and rendered on every validation (as before)
+    - compiled : template compiled once, rendered on every validation
+    - cached : re-validating an unchanged config doesn't re-render
+
+usage: python benchmarks/bench_shell_template.py [n_configs]
+"""
+import sys
+import time
+import pathlib
+import tempfile
+
+from ipyrun.runshell import SHELL_RENDERER, compile_template
+from ipyrun.examples.linegraph.linegraph_app import LineGraphConfigShell
+
+
+def time_validation(dumps, before_each=lambda: None):
+    start = time.perf_counter()
+    for di in dumps:
+        before_each()
+        LineGraphConfigShell(**di)
+    return (time.perf_counter() - start) / len(dumps)
+
+
+def main(n=500):
+    fdir = pathlib.Path(tempfile.mkdtemp())
+    dumps = [
+        LineGraphConfigShell(index=i, fdir_root=fdir).model_dump(mode="json")
+        for i in range(n)
+    ]
+
+    def uncached():
+        compile_template.cache_clear()
+        SHELL_RENDERER._rendered.clear()
+
+    results = {
+        "uncached": time_validation(dumps, uncached),
+        "compiled": time_validation(dumps, SHELL_RENDERER._rendered.clear),
+        "cached": time_validation(dumps),
+    }
+    print(f"{n} configs")
+    print(f"{'':<10}{'per config (ms)':>18}")
+    for k, t in results.items():
+        print(f"{k:<10}{t * 1000:>18.3f}")
+    print(f"saved per config: {(results['uncached'] - results['compiled']) * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
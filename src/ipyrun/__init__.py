@@ -7,6 +7,26 @@ Overview:
     - actions.py : defines the actions (callables) that are accessible through the RunUi
     - runshell.py : defines a config schema for ConfigRunShell(ConfigBatchShell) 
         and extends ActionsRun(ActiomsBatch) to ActionsRunShell(ActionsBatchShell) based on config
+    - runexec.py : executes the shell command of a config as a subprocess. no widgets in here,
+        allows many runs to be executed concurrently from a BatchApp.
+    - rundag.py : orders the runs of a batch by their dependencies (matching input / output paths)
+        and executes them in waves of concurrent runs.
+    - runworkers.py : a pool of warm python worker processes that fork to execute runs,
+        avoiding interpreter startup and import costs for many small runs.
+    - runmanifest.py : an optional protocol for executing the runs of a batch that share a
+        script in one process, passing the script a manifest of the runs.
+    - runstatus.py : run status judged on the content of the inputs (hashed) recorded when
+        the outputs were made, rather than on modification times.
+    - runwatch.py : watches the files of a batch (watchdog or polling) and pushes status
+        updates to the affected runs.
+    - runhistory.py : appends every run to runhistory.csv and shows it as a paginated,
+        filterable runlog.
+    - runcache.py : a content-addressed cache of run outputs, restored rather than
+        re-running when the inputs, code and params have been run before.
+    - runsave.py : write-behind saving of configs. saves are coalesced and written
+        atomically on a background thread.
+    - runindex.py : the batch config as an index of its runs. each run's config is stored
+        in its own folder and loaded on first use.
     - runsnake.py : doesn't exist yet - but a new config could be added to re-use the same UI 
         to run snakemake commands rather than subprocess ones. 
     - runui.py : builds the generic UI classes. the actions associated to the buttons are programable. 
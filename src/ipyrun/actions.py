@@ -119,6 +119,7 @@ class RunActions(BaseModel, validate_assignment=True):
     )
     run: Optional[Callable] = Field(lambda: "run", validate_default=True)
     run_hide: Optional[Callable] = Field(lambda: "console_hide", validate_default=True)
+    cancel: Optional[Callable] = Field(lambda: "cancel", validate_default=True)
     activate: Optional[Callable] = Field(lambda: "activate", validate_default=True)
     deactivate: Optional[Callable] = Field(lambda: "deactivate", validate_default=True)
     show: Optional[Callable] = Field(lambda: "show", validate_default=True)
@@ -211,6 +212,11 @@ class BatchActions(RunActions):
     review_hide: Optional[Callable] = Field(
         lambda: "review_hide", validate_default=True
     )
+    watch: Optional[Callable] = Field(
+        None,
+        description="starts pushing status updates to the runs when their files change",
+        validate_default=True,
+    )
 
 
 class DefaultBatchActions(DefaultRunActions):
@@ -244,5 +250,10 @@ class DefaultBatchActions(DefaultRunActions):
     review_hide: Optional[Callable] = Field(
         lambda: "review_hide", validate_default=True
     )
+    watch: Optional[Callable] = Field(
+        None,
+        description="starts pushing status updates to the runs when their files change",
+        validate_default=True,
+    )
 
     model_config = ConfigDict(check_fields=False)
@@ -26,6 +26,8 @@ PATH_PYTHONPATH_EXAMPLE = PATH_PACKAGE / "examples" / "linegraph"
 PATH_CONFIG = pathlib.Path("config-shell_handler.json")
 PATH_RUNHISTORY = pathlib.Path("runhistory.csv")
 PATH_LOG = pathlib.Path("log.csv")
+PATH_CONSOLE = pathlib.Path("console.log")
+PATH_RUNRECORD = pathlib.Path("runrecord.json")
 
 FILENAME_FORBIDDEN_CHARACTERS = {"<", ">", ":", '"', "/", "\\", "|", "?", "*"}
 # [naming-a-file](https://docs.microsoft.com/en-us/windows/win32/fileio/naming-a-file)
@@ -69,10 +71,29 @@ STATUS_BUTTON_ERROR = frozenmap(
     # disabled=True,
 )
 
+STATUS_BUTTON_CANCELLED = frozenmap(
+    icon="ban",
+    style={},
+    button_style="warning",
+    tooltip="last run was cancelled",
+    layout={"width": BUTTON_WIDTH_MIN, "height": "40px"},
+    # disabled=True,
+)
+STATUS_BUTTON_TIMEDOUT = frozenmap(
+    icon="hourglass-end",
+    style={},
+    button_style="warning",
+    tooltip="last run timed out",
+    layout={"width": BUTTON_WIDTH_MIN, "height": "40px"},
+    # disabled=True,
+)
+
 DI_STATUS_MAP = frozenmap(
     up_to_date=STATUS_BUTTON_UPTODATE,
     no_outputs=STATUS_BUTTON_NOOUTPUTS,
     outputs_need_updating=STATUS_BUTTON_NEEDSRERUN,
+    cancelled=STATUS_BUTTON_CANCELLED,
+    timed_out=STATUS_BUTTON_TIMEDOUT,
     error=STATUS_BUTTON_ERROR,
 )
 # ------------------------------------------------
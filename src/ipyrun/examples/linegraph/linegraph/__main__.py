@@ -28,6 +28,30 @@ def main(fpth_in, fpth_out_csv, fpth_out_plotly):
     return df
 
 
+def main_manifest(fpth_manifest):
+    """processes every run in an ipyrun manifest (see `ipyrun.runmanifest`) in this
+    process, writing the status of each run to the manifest's `fpth_results`.
+
+    Args:
+        fpth_manifest (str)
+    """
+    import time
+    import traceback
+
+    manifest = json.loads(pathlib.Path(fpth_manifest).read_text())
+    results = {}
+    for run in manifest["runs"]:
+        start = time.time()
+        try:
+            print(f"{run['key']}")
+            main(*run["fpths_inputs"], *run["fpths_outputs"])
+            results[run["key"]] = {"status": "success"}
+        except Exception:
+            results[run["key"]] = {"status": "failed", "message": traceback.format_exc()}
+        results[run["key"]]["duration"] = time.time() - start
+    pathlib.Path(manifest["fpth_results"]).write_text(json.dumps(results))
+
+
 if __name__ == "__main__":
     # if __debug__:
     #     import os
@@ -40,6 +64,9 @@ if __name__ == "__main__":
     # else:
     import sys
 
+    if sys.argv[1] == "--manifest":
+        main_manifest(sys.argv[2])
+        sys.exit(0)
     fpth_in = sys.argv[1]
     fpth_out_csv = sys.argv[2]
     fpth_out_plotly = sys.argv[3]
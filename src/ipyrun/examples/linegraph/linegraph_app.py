@@ -21,6 +21,19 @@ class LineGraphConfigShell(DefaultConfigShell):
     def _set_path_run(cls, v, info: ValidationInfo):
         return pathlib.Path("linegraph")
 
+    @field_validator("preload_modules")
+    def _preload_modules(cls, v, info: ValidationInfo):
+        if not v:
+            v = [
+                "numpy",
+                "pandas",
+                "plotly.express",
+                "plotly.graph_objects",
+                "linegraph.make_graph",
+                "linegraph.input_schema_linegraph",
+            ]
+        return v
+
     @field_validator("fpths_outputs")
     def _fpths_outputs(cls, v, info: ValidationInfo):
         fdir = info.data["fdir_appdata"]
@@ -0,0 +1,227 @@
+"""
+a content-addressed cache of run outputs. the key is the hash of everything that
+determines the outputs: the content of the inputs, the `path_run` source, `params`,
+`call` and the rendered `shell` (with the input / output paths replaced by placeholders
+so that runs with identical inputs in different folders share an entry). on a hit the
+outputs are restored from the cache (copied, or hardlinked if `link=True`) rather than
+executing the process.
+
+entries are stored as `fdir/<key[:2]>/<key>/` containing the outputs and an `entry.json`
+whose mtime is the time the entry was last used. once the cache exceeds `max_bytes` the
+least recently used entries are evicted.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import pathlib
+import tempfile
+import threading
+import typing as ty
+
+from ipyrun.runexec import RunResult, execute_shell
+from ipyrun.runstatus import HASH_CACHE, HashCache, hash_path_run
+
+FDIR_RUN_CACHE = pathlib.Path.home() / ".cache" / "ipyrun" / "runcache"
+MAX_BYTES = 2**30
+ENTRY = "entry.json"
+
+
+def _normalise_shell(config) -> str:
+    shell = config.shell
+    for n, f in enumerate(config.fpths_inputs or []):
+        shell = shell.replace(str(f), f"{{input{n}}}")
+    for n, f in enumerate(config.fpths_outputs or []):
+        shell = shell.replace(str(f), f"{{output{n}}}")
+    return shell
+
+
+def cache_key(config, cache: HashCache = HASH_CACHE) -> ty.Optional[str]:
+    """None if an input is missing, i.e. the run can't be cached"""
+    inputs = []
+    for f in config.fpths_inputs or []:
+        state = cache.file_state(f)
+        if state is None:
+            return None
+        inputs.append(state.hash)
+    di = dict(
+        inputs=inputs,
+        path_run=hash_path_run(config, cache=cache),
+        params=config.params or {},
+        call=config.call,
+        shell=_normalise_shell(config),
+    )
+    s = json.dumps(di, sort_keys=True, default=str)
+    return hashlib.sha256(s.encode()).hexdigest()
+
+
+class RunCache:
+    """outputs stored by cache key, with least recently used eviction
+
+    Args:
+        fdir (pathlib.Path): where the cache is stored
+        max_bytes (int, optional): size limit. defaults to 1GB
+        link (bool, optional): restore by hardlinking rather than copying. faster and
+            uses no extra space, but the restored outputs must not be edited in place.
+            hits are checked against the stored hashes, so edits cause a miss rather
+            than restoring the wrong content
+    """
+
+    def __init__(self, fdir=FDIR_RUN_CACHE, max_bytes: int = MAX_BYTES, link=False):
+        self.fdir = pathlib.Path(fdir)
+        self.max_bytes = max_bytes
+        self.link = link
+        self.hash_cache = HASH_CACHE
+        self._lock = threading.Lock()
+
+    def _fdir_entry(self, key: str) -> pathlib.Path:
+        return self.fdir / key[:2] / key
+
+    def get(self, key: str) -> ty.Optional[dict]:
+        fdir = self._fdir_entry(key)
+        try:
+            entry = json.loads((fdir / ENTRY).read_text())
+        except (OSError, ValueError):
+            return None
+        for name, h in zip(entry["outputs"], entry["hashes"]):
+            state = self.hash_cache.file_state(fdir / name)
+            if state is None or state.hash != h:  # i.e. a hardlinked output was edited
+                self.remove(key)
+                return None
+        return entry
+
+    def restore(self, key: str, fpths_outputs: ty.List[pathlib.Path]) -> bool:
+        """restores the outputs if the key is in the cache"""
+        entry = self.get(key)
+        if entry is None or len(entry["outputs"]) != len(fpths_outputs):
+            return False
+        fdir = self._fdir_entry(key)
+        for name, f in zip(entry["outputs"], fpths_outputs):
+            f = pathlib.Path(f)
+            f.parent.mkdir(parents=True, exist_ok=True)
+            if f.exists():
+                f.unlink()
+            if self.link:
+                try:
+                    os.link(fdir / name, f)
+                    os.utime(f)  # outputs are newer than the inputs
+                    continue
+                except OSError:  # e.g. a different filesystem
+                    pass
+            shutil.copyfile(fdir / name, f)
+        os.utime(fdir / ENTRY)  # last used
+        return True
+
+    def store(self, key: str, fpths_outputs: ty.List[pathlib.Path]):
+        fdir = self._fdir_entry(key)
+        if (fdir / ENTRY).is_file():
+            return
+        fdir.parent.mkdir(parents=True, exist_ok=True)
+        tmp = pathlib.Path(tempfile.mkdtemp(dir=fdir.parent, prefix=".tmp-"))
+        entry = dict(outputs=[], hashes=[], size=0)
+        try:
+            for n, f in enumerate(fpths_outputs):
+                name = str(n)
+                shutil.copyfile(f, tmp / name)
+                entry["outputs"].append(name)
+                entry["hashes"].append(self.hash_cache.file_state(tmp / name).hash)
+                entry["size"] += (tmp / name).stat().st_size
+            (tmp / ENTRY).write_text(json.dumps(entry))
+            os.rename(tmp, fdir)
+        except OSError:  # e.g. stored concurrently by another run
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+
+    def remove(self, key: str):
+        shutil.rmtree(self._fdir_entry(key), ignore_errors=True)
+
+    def entries(self) -> ty.List[ty.Tuple[float, int, str]]:
+        """(last used, size, key) of every entry, least recently used first"""
+        li = []
+        for fpth in self.fdir.glob(f"*/*/{ENTRY}"):
+            try:
+                size = json.loads(fpth.read_text())["size"]
+                li.append((fpth.stat().st_mtime, size, fpth.parent.name))
+            except (OSError, ValueError, KeyError):
+                pass
+        return sorted(li)
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """removes the least recently used entries until within max_bytes"""
+        with self._lock:
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in entries:
+                if total <= self.max_bytes:
+                    break
+                self.remove(key)
+                total -= size
+
+
+_CACHES: ty.Dict[tuple, RunCache] = {}
+
+
+def get_run_cache(config) -> ty.Optional[RunCache]:
+    if not getattr(config, "use_run_cache", False):
+        return None
+    fdir = config.fdir_run_cache or FDIR_RUN_CACHE
+    k = (str(fdir), config.run_cache_max_bytes, config.run_cache_link)
+    if k not in _CACHES:
+        _CACHES[k] = RunCache(fdir, config.run_cache_max_bytes, config.run_cache_link)
+    return _CACHES[k]
+
+
+def restore_run(config, on_output=None, key=None) -> ty.Optional[RunResult]:
+    """a successful RunResult if the outputs were restored from the cache"""
+    cache = get_run_cache(config)
+    if cache is None or not config.fpths_outputs:
+        return None
+    start = time.time()
+    key = key if key is not None else cache_key(config)
+    if key is None or not cache.restore(key, config.fpths_outputs):
+        return None
+    msg = f"outputs restored from the run cache ({key[:12]})\n"
+    if on_output is not None:
+        on_output(msg)
+    return RunResult(
+        key=config.key,
+        status="success",
+        returncode=0,
+        start=start,
+        end=time.time(),
+        stdout=msg,
+        cached=True,
+    )
+
+
+def store_run(config, result: RunResult, key: ty.Optional[str] = None):
+    """`key` should be taken before the run, in case the run changes its inputs"""
+    cache = get_run_cache(config)
+    if cache is None or result.status != "success" or result.cached or key is None:
+        return
+    if not all(pathlib.Path(f).is_file() for f in config.fpths_outputs or []):
+        return
+    cache.store(key, config.fpths_outputs)
+
+
+def execute_cached(
+    config,
+    on_output: ty.Optional[ty.Callable[[str], ty.Any]] = None,
+    cancel: ty.Optional[threading.Event] = None,
+    fn_execute: ty.Callable = execute_shell,
+) -> RunResult:
+    """restores the outputs from the run cache if possible, otherwise executes the run
+    with `fn_execute` and stores its outputs"""
+    key = cache_key(config) if get_run_cache(config) is not None else None
+    result = restore_run(config, on_output=on_output, key=key)
+    if result is not None:
+        return result
+    result = fn_execute(config, on_output=on_output, cancel=cancel)
+    store_run(config, result, key=key)
+    return result
@@ -0,0 +1,134 @@
+"""
+dependency aware scheduling of the runs within a batch. a run depends on another if one
+of its `fpths_inputs` is one of the other's `fpths_outputs`, or if the other's key is
+listed in its `depends_on`. runs are executed in waves: every run in a wave only
+depends on runs in earlier waves, so all the runs in a wave can execute concurrently.
+"""
+import os
+import time
+import threading
+import typing as ty
+
+from ipyrun.runexec import RunResult, BatchResult, execute_batch, execute_shell
+
+
+def _normpath(path) -> str:
+    return os.path.normcase(os.path.abspath(str(path)))
+
+
+def build_graph(configs: ty.List) -> ty.Dict[str, ty.Set[str]]:
+    """map of config key to the set of keys it depends on. only dependencies within
+    `configs` are included (i.e. runs not in the batch are treated as up-to-date).
+
+    Args:
+        configs (ty.List[ConfigShell]): configs to be run
+
+    Returns:
+        ty.Dict[str, ty.Set[str]]: {key: upstream keys}
+    """
+    keys = {c.key for c in configs}
+    producers = {}
+    for c in configs:
+        for f in c.fpths_outputs or []:
+            producers[_normpath(f)] = c.key
+    graph = {}
+    for c in configs:
+        deps = {
+            producers[_normpath(f)]
+            for f in c.fpths_inputs or []
+            if _normpath(f) in producers
+        }
+        deps |= set(c.depends_on or []) & keys
+        deps.discard(c.key)
+        graph[c.key] = deps
+    return graph
+
+
+def topological_waves(graph: ty.Dict[str, ty.Set[str]]) -> ty.List[ty.List[str]]:
+    """sorts the graph into waves of keys that can be executed concurrently.
+    order within a wave follows the order of the graph.
+
+    Raises:
+        ValueError: if the graph contains a cycle
+    """
+    remaining = {k: set(v) for k, v in graph.items()}
+    waves = []
+    while remaining:
+        wave = [k for k, v in remaining.items() if not v]
+        if not wave:
+            raise ValueError(
+                f"circular dependency between runs: {', '.join(remaining.keys())}"
+            )
+        for k in wave:
+            del remaining[k]
+        for v in remaining.values():
+            v.difference_update(wave)
+        waves.append(wave)
+    return waves
+
+
+def execute_dag(
+    configs: ty.List,
+    max_workers: ty.Optional[int] = None,
+    fn_execute: ty.Callable = execute_shell,
+    on_complete: ty.Optional[ty.Callable[[RunResult], ty.Any]] = None,
+    cancel: ty.Optional[threading.Event] = None,
+    group_by: ty.Optional[ty.Callable[[ty.Any], ty.Hashable]] = None,
+    fn_execute_many: ty.Optional[ty.Callable[[ty.List], ty.List[RunResult]]] = None,
+) -> BatchResult:
+    """execute configs in dependency order, running independent configs concurrently.
+    if a run fails then everything downstream of it is skipped.
+
+    Args:
+        configs (ty.List): list of configs passed to `fn_execute`
+        max_workers (int, optional): max number of concurrent processes. defaults to os.cpu_count()
+        fn_execute (ty.Callable, optional): executes a single config. defaults to execute_shell
+        on_complete (ty.Callable, optional): called with each RunResult as it completes
+        cancel (threading.Event, optional): once set, runs that haven't started are
+            skipped. see `execute_batch`
+        group_by (ty.Callable, optional): see `execute_batch`. runs are only grouped
+            with others in the same wave
+        fn_execute_many (ty.Callable, optional): see `execute_batch`
+
+    Returns:
+        BatchResult
+    """
+    graph = build_graph(configs)
+    waves = topological_waves(graph)
+    di_configs = {c.key: c for c in configs}
+    start = time.time()
+    results, failed = [], set()
+    for wave in waves:
+        todo = []
+        for k in wave:
+            upstream_failed = graph[k] & failed
+            if upstream_failed:
+                result = RunResult(
+                    key=k,
+                    status="skipped",
+                    stdout=f"skipped as upstream failed: {', '.join(sorted(upstream_failed))}",
+                )
+                failed.add(k)
+                results.append(result)
+                if on_complete is not None:
+                    on_complete(result)
+            else:
+                todo.append(di_configs[k])
+        if not todo:
+            continue
+        batch_result = execute_batch(
+            todo,
+            max_workers=max_workers,
+            fn_execute=fn_execute,
+            on_complete=on_complete,
+            cancel=cancel,
+            group_by=group_by,
+            fn_execute_many=fn_execute_many,
+        )
+        results += batch_result.results
+        failed |= {r.key for r in batch_result.results if not r.ok}
+    return BatchResult(
+        results=results,
+        wall_time=time.time() - start,
+        max_workers=max_workers or os.cpu_count() or 1,
+    )
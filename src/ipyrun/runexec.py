@@ -0,0 +1,583 @@
+"""
+process execution for shell runs. nothing in here knows about widgets; the functions
+take a config object (see `ipyrun.runshell.ConfigShell`) and execute `config.shell`
+as a subprocess. this lets the BatchApp execute many runs concurrently and report
+back to the UI as each one completes.
+"""
+import os
+import sys
+import time
+import signal
+import pathlib
+import asyncio
+import threading
+import typing as ty
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from pydantic import Field
+from ipyrun.basemodel import BaseModel
+
+
+def udpate_env(append_to_pythonpath: str):
+    env = os.environ.copy()
+    if not "PYTHONPATH" in env.keys():
+        env["PYTHONPATH"] = str(append_to_pythonpath)
+    else:
+        env["PYTHONPATH"] = (
+            env["PYTHONPATH"] + f"{os.pathsep}{str(append_to_pythonpath)}"
+        )
+    return env
+
+
+def get_env(config):
+    if config.pythonpath is None:
+        env = os.environ.copy()
+    else:
+        env = udpate_env(config.pythonpath)
+    env["PYTHONUNBUFFERED"] = "1"  # python children print line by line when piped
+    return env
+
+
+N_TAIL = 100  # lines of output kept in memory on the RunResult
+
+
+class OutputStreamer:
+    """rate-limited forwarding of process output lines to `fn_write`
+    (e.g. `widgets.Output.append_stdout`). lines are buffered and sent at most every
+    `interval` seconds. after `max_lines` lines no more are sent until `close`, which
+    reports how many were held back and sends the last `n_tail` lines."""
+
+    def __init__(self, fn_write, interval=0.25, max_lines=1000, n_tail=20):
+        self.fn_write = fn_write
+        self.interval = interval
+        self.max_lines = max_lines
+        self.n_sent = 0
+        self.n_held = 0
+        self._buffer = []
+        self._tail = deque(maxlen=n_tail)
+        self._last = 0.0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __call__(self, line: str):
+        with self._lock:
+            if self.n_sent + len(self._buffer) >= self.max_lines:
+                self.n_held += 1
+                self._tail.append(line)
+                return
+            self._buffer.append(line)
+            wait = self.interval - (time.time() - self._last)
+            if wait <= 0:
+                self._flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(wait, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._buffer:
+            self.fn_write("".join(self._buffer))
+            self.n_sent += len(self._buffer)
+            self._buffer = []
+        self._last = time.time()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self, fpth_console=None):
+        with self._lock:
+            self._flush()
+            if self.n_held:
+                where = f" see {str(fpth_console)} for the full output." if fpth_console else ""
+                n_hidden = self.n_held - len(self._tail)
+                if n_hidden:
+                    self.fn_write(f"\n... {n_hidden} lines not shown.{where}\n\n")
+                self.fn_write("".join(self._tail))
+
+
+class _Console:
+    """tees process output lines to the console log file, a tail kept in memory
+    and an optional callback"""
+
+    def __init__(self, fpth_console=None, on_output=None):
+        self.on_output = on_output
+        self.tail = deque(maxlen=N_TAIL)
+        self.file = None
+        if fpth_console is not None:
+            self.file = open(fpth_console, "w", encoding="utf-8")
+
+    def write(self, line: str):
+        if self.file is not None:
+            self.file.write(line)
+        self.tail.append(line)
+        if self.on_output is not None:
+            self.on_output(line)
+
+    def close(self) -> str:
+        if self.file is not None:
+            self.file.close()
+        return "".join(self.tail)
+
+
+HAS_WAIT4 = hasattr(os, "wait4")
+
+
+class ResourceUsage(BaseModel):
+    """resources used by the process of a run (including any children it waited for),
+    as reported by `os.wait4`"""
+
+    user_time: float = Field(0.0, description="user CPU time (s)")
+    sys_time: float = Field(0.0, description="system CPU time (s)")
+    max_rss: int = Field(0, description="peak resident set size (bytes)")
+    block_in: int = Field(0, description="number of block input operations")
+    block_out: int = Field(0, description="number of block output operations")
+    voluntary_switches: int = 0
+    involuntary_switches: int = 0
+
+    @classmethod
+    def from_rusage(cls, ru) -> "ResourceUsage":
+        return cls(
+            user_time=ru.ru_utime,
+            sys_time=ru.ru_stime,
+            max_rss=ru.ru_maxrss * (1 if sys.platform == "darwin" else 1024),
+            block_in=ru.ru_inblock,
+            block_out=ru.ru_oublock,
+            voluntary_switches=ru.ru_nvcsw,
+            involuntary_switches=ru.ru_nivcsw,
+        )
+
+    @property
+    def cpu_time(self) -> float:
+        return self.user_time + self.sys_time
+
+    def share(self, fraction: float) -> "ResourceUsage":
+        """`fraction` of the usage, e.g. of one of the runs executed by a single process
+        (see `ipyrun.runmanifest`). the peak rss is that of the whole process"""
+        return self.model_copy(
+            update=dict(
+                user_time=self.user_time * fraction,
+                sys_time=self.sys_time * fraction,
+                block_in=round(self.block_in * fraction),
+                block_out=round(self.block_out * fraction),
+                voluntary_switches=round(self.voluntary_switches * fraction),
+                involuntary_switches=round(self.involuntary_switches * fraction),
+            )
+        )
+
+    def summary(self) -> str:
+        return (
+            f"cpu = {self.cpu_time:.2f}s (user {self.user_time:.2f}s, sys"
+            f" {self.sys_time:.2f}s), peak rss = {self.max_rss / 2**20:.1f}MB,"
+            f" block in/out = {self.block_in}/{self.block_out}, context switches"
+            f" = {self.voluntary_switches}/{self.involuntary_switches}"
+        )
+
+
+def percentile(values: ty.List[float], q: float) -> float:
+    """nearest-rank percentile, q in [0, 100]"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, round(q / 100 * len(values) + 0.5) - 1))]
+
+
+class RunResult(BaseModel):
+    """the outcome of executing the shell command of a single config"""
+
+    key: ty.Optional[str] = None
+    status: str = Field(
+        "pending",
+        description=(
+            'one of: "pending", "success", "up_to_date", "failed", "skipped",'
+            ' "cancelled", "timed_out"'
+        ),
+    )
+    returncode: ty.Optional[int] = None
+    start: ty.Optional[float] = None
+    end: ty.Optional[float] = None
+    stdout: str = Field("", description=f"the last {N_TAIL} lines of output")
+    fpth_console: ty.Optional[pathlib.Path] = Field(
+        None, description="file containing the full output of the process"
+    )
+    resources: ty.Optional[ResourceUsage] = None
+    cached: bool = Field(False, description="outputs restored from the run cache")
+
+    @property
+    def duration(self) -> float:
+        if self.start is None or self.end is None:
+            return 0.0
+        return self.end - self.start
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ("success", "up_to_date")
+
+
+class BatchResult(BaseModel):
+    """the outcome of executing many configs"""
+
+    results: ty.List[RunResult] = []
+    wall_time: float = 0.0
+    max_workers: int = 1
+
+    @property
+    def serial_time(self) -> float:
+        """sum of the individual run durations, i.e. the time taken if run one at a time"""
+        return sum(r.duration for r in self.results)
+
+    @property
+    def speedup(self) -> float:
+        if self.wall_time == 0:
+            return 1.0
+        return self.serial_time / self.wall_time
+
+    def resource_totals(self) -> ResourceUsage:
+        """summed over the runs, except max_rss which is the largest of any run"""
+        li = [r.resources for r in self.results if r.resources is not None]
+        fields = [k for k in ResourceUsage.model_fields if k != "max_rss"]
+        return ResourceUsage(
+            max_rss=max([u.max_rss for u in li], default=0),
+            **{k: sum(getattr(u, k) for u in li) for k in fields},
+        )
+
+    def resource_percentiles(
+        self, qs: ty.Sequence[float] = (50, 90, 100)
+    ) -> ty.Dict[str, ty.Dict[float, float]]:
+        """percentiles of duration, cpu time and peak rss across the runs"""
+        li = [r.resources for r in self.results if r.resources is not None]
+        values = {
+            "duration": [r.duration for r in self.results if r.resources is not None],
+            "cpu_time": [u.cpu_time for u in li],
+            "max_rss": [u.max_rss for u in li],
+        }
+        return {k: {q: percentile(v, q) for q in qs} for k, v in values.items()}
+
+    def summary(self) -> str:
+        n_ok = len([r for r in self.results if r.ok])
+        s = (
+            f"{n_ok}/{len(self.results)} runs succeeded."
+            f" wall time = {self.wall_time:.2f}s, serial time = {self.serial_time:.2f}s"
+            f" (x{self.speedup:.1f} with max_workers={self.max_workers})"
+        )
+        if any(r.resources is not None for r in self.results):
+            p = self.resource_percentiles()
+            s += (
+                f"\ntotal: {self.resource_totals().summary()}"
+                f"\ncpu time p50/p90/max = "
+                + "/".join(f"{v:.2f}" for v in p["cpu_time"].values())
+                + "s, peak rss p50/p90/max = "
+                + "/".join(f"{v / 2**20:.1f}" for v in p["max_rss"].values())
+                + "MB"
+            )
+        return s
+
+
+POLL_INTERVAL = 0.1  # seconds between checks for cancellation / timeout
+KILL_GRACE = 2.0  # seconds between SIGTERM and SIGKILL
+NOT_RUN_CANCELLED = "not run as the batch was cancelled"
+
+
+def _process_group_kwargs():
+    """start the process in its own group so that it can be killed with its children"""
+    if os.name == "nt":
+        return dict(creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+    return dict(start_new_session=True)
+
+
+def kill_process_group(proc: subprocess.Popen):
+    """kill the process and everything it started"""
+    if os.name == "nt":
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(proc.pid)], capture_output=True
+        )
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=KILL_GRACE)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _check_interrupt(start, cancel=None, timeout=None) -> ty.Optional[str]:
+    if cancel is not None and cancel.is_set():
+        return "cancelled"
+    if timeout is not None and time.time() - start > timeout:
+        return "timed_out"
+    return None
+
+
+def _wait(proc, start, cancel=None, timeout=None) -> ty.Optional[str]:
+    """wait for the process to exit. kills the process group if cancelled or timed out,
+    returning "cancelled" or "timed_out"."""
+    while True:
+        try:
+            proc.wait(timeout=POLL_INTERVAL)
+            return None
+        except subprocess.TimeoutExpired:
+            pass
+        interrupted = _check_interrupt(start, cancel=cancel, timeout=timeout)
+        if interrupted is not None:
+            kill_process_group(proc)
+            return interrupted
+
+
+def _reap(proc) -> ty.Tuple[bool, ty.Optional[ResourceUsage]]:
+    """`os.wait4` without blocking. once the process has exited, sets its returncode
+    and returns (True, resource usage)"""
+    try:
+        pid, status, ru = os.wait4(proc.pid, os.WNOHANG)
+    except ChildProcessError:  # i.e. already reaped
+        proc.wait()
+        return True, None
+    if pid == 0:
+        return False, None
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return True, ResourceUsage.from_rusage(ru)
+
+
+def _wait4(
+    proc, start, cancel=None, timeout=None
+) -> ty.Tuple[ty.Optional[str], ty.Optional[ResourceUsage]]:
+    """as `_wait`, also returning the resource usage of the process"""
+    delay, next_check = 0.0005, time.time() + POLL_INTERVAL
+    while True:
+        done, resources = _reap(proc)
+        if done:
+            return None, resources
+        if time.time() >= next_check:
+            interrupted = _check_interrupt(start, cancel=cancel, timeout=timeout)
+            if interrupted is not None:
+                kill_process_group(proc)
+                return interrupted, None
+            next_check = time.time() + POLL_INTERVAL
+        time.sleep(delay)
+        delay = min(delay * 2, 0.05)
+
+
+async def _wait4_async(
+    proc, start, cancel=None, timeout=None
+) -> ty.Tuple[ty.Optional[str], ty.Optional[ResourceUsage]]:
+    """as `_wait4`, sleeping on the event loop between checks. without `os.wait4`
+    the process is polled and no resource usage is returned"""
+    loop = asyncio.get_running_loop()
+    delay, next_check = 0.0005, time.time() + POLL_INTERVAL
+    while True:
+        if HAS_WAIT4:
+            done, resources = _reap(proc)
+        else:
+            done, resources = proc.poll() is not None, None
+        if done:
+            return None, resources
+        if time.time() >= next_check:
+            interrupted = _check_interrupt(start, cancel=cancel, timeout=timeout)
+            if interrupted is not None:
+                await loop.run_in_executor(None, kill_process_group, proc)
+                return interrupted, None
+            next_check = time.time() + POLL_INTERVAL
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.05)
+
+
+def _read_lines(stream, console):
+    for line in stream:
+        console.write(line)
+
+
+def _set_outcome(result, console, returncode, interrupted):
+    result.returncode = returncode
+    if interrupted is not None:
+        result.status = interrupted
+        console.write(f"\n{interrupted}. process killed after {time.time() - result.start:.1f}s\n")
+    else:
+        result.status = "success" if returncode == 0 else "failed"
+
+
+def _start(config, console) -> ty.Tuple[subprocess.Popen, threading.Thread]:
+    """start the process, and a thread writing its output to the console"""
+    proc = subprocess.Popen(
+        config.shell.split(" "),
+        env=get_env(config),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        errors="replace",
+        bufsize=1,
+        **_process_group_kwargs(),
+    )
+    reader = threading.Thread(
+        target=_read_lines, args=(proc.stdout, console), daemon=True
+    )
+    reader.start()
+    return proc, reader
+
+
+def execute_shell(
+    config,
+    on_output: ty.Optional[ty.Callable[[str], ty.Any]] = None,
+    cancel: ty.Optional[threading.Event] = None,
+) -> RunResult:
+    """execute `config.shell` in a subprocess and wait for it to finish. stdout and stderr
+    are read line by line as the process writes them. the process (and any processes it
+    starts) is killed if `cancel` is set or `config.timeout` is exceeded.
+
+    Args:
+        config (ConfigShell): requires `key`, `shell` and `pythonpath` attributes. if it
+            has a `fpth_console` the full output is written there.
+        on_output (ty.Callable, optional): called with each line of output. see OutputStreamer
+        cancel (threading.Event, optional): set to kill the process
+
+    Returns:
+        RunResult
+    """
+    fpth_console = getattr(config, "fpth_console", None)
+    result = RunResult(key=config.key, start=time.time(), fpth_console=fpth_console)
+    console = _Console(fpth_console, on_output)
+    try:
+        proc, reader = _start(config, console)
+    except OSError as e:
+        console.write(str(e))
+        result.status = "failed"
+    else:
+        timeout = getattr(config, "timeout", None)
+        if HAS_WAIT4:
+            interrupted, result.resources = _wait4(
+                proc, result.start, cancel=cancel, timeout=timeout
+            )
+        else:
+            interrupted = _wait(proc, result.start, cancel=cancel, timeout=timeout)
+        reader.join(timeout=KILL_GRACE)
+        proc.stdout.close()
+        _set_outcome(result, console, proc.returncode, interrupted)
+    result.stdout = console.close()
+    result.end = time.time()
+    return result
+
+
+async def execute_shell_async(
+    config,
+    on_output: ty.Optional[ty.Callable[[str], ty.Any]] = None,
+    cancel: ty.Optional[threading.Event] = None,
+) -> RunResult:
+    """as `execute_shell`, but waiting for the process doesn't block the event loop.
+    the process is reaped with `os.wait4` (rather than by asyncio's child watcher) so
+    that its resource usage is recorded as for `execute_shell`.
+
+    Args:
+        config (ConfigShell): requires `key`, `shell` and `pythonpath` attributes. if it
+            has a `fpth_console` the full output is written there.
+        on_output (ty.Callable, optional): called with each line of output. see OutputStreamer
+        cancel (threading.Event, optional): set to kill the process
+
+    Returns:
+        RunResult
+    """
+    fpth_console = getattr(config, "fpth_console", None)
+    result = RunResult(key=config.key, start=time.time(), fpth_console=fpth_console)
+    console = _Console(fpth_console, on_output)
+    try:
+        proc, reader = _start(config, console)
+    except OSError as e:
+        console.write(str(e))
+        result.status = "failed"
+        result.stdout = console.close()
+        result.end = time.time()
+        return result
+    try:
+        interrupted, result.resources = await _wait4_async(
+            proc, result.start, cancel=cancel, timeout=getattr(config, "timeout", None)
+        )
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, reader.join, KILL_GRACE)
+    except BaseException:  # i.e. cancelled. the process must not be left running
+        kill_process_group(proc)
+        console.close()
+        raise
+    finally:
+        proc.stdout.close()
+    _set_outcome(result, console, proc.returncode, interrupted)
+    result.stdout = console.close()
+    result.end = time.time()
+    return result
+
+
+def schedule(coro):
+    """schedule a coroutine on the running event loop (e.g. the Jupyter kernel's loop)
+    and return the task. if there is no running loop the coroutine is run to completion
+    and its result returned."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    return loop.create_task(coro)
+
+
+def execute_batch(
+    configs: ty.List,
+    max_workers: ty.Optional[int] = None,
+    fn_execute: ty.Callable = execute_shell,
+    on_complete: ty.Optional[ty.Callable[[RunResult], ty.Any]] = None,
+    cancel: ty.Optional[threading.Event] = None,
+    group_by: ty.Optional[ty.Callable[[ty.Any], ty.Hashable]] = None,
+    fn_execute_many: ty.Optional[ty.Callable[[ty.List], ty.List[RunResult]]] = None,
+) -> BatchResult:
+    """execute many configs concurrently on a pool of at most `max_workers` processes.
+
+    the subprocesses are launched and waited on from worker threads, `on_complete`
+    is called from the calling thread as each run finishes (in order of completion),
+    so it is safe to use it to update the UI.
+
+    Args:
+        configs (ty.List): list of configs passed to `fn_execute`
+        max_workers (int, optional): max number of concurrent processes. defaults to os.cpu_count()
+        fn_execute (ty.Callable, optional): executes a single config. defaults to execute_shell
+        on_complete (ty.Callable, optional): called with each RunResult as it completes
+        cancel (threading.Event, optional): once set, runs that haven't started are
+            skipped, i.e. not run and reported as "skipped" rather than "cancelled", so
+            their status is left as it was. runs that are executing are only killed by
+            the cancel event passed to `fn_execute` (see `ipyrun.runshell.cancel_run`)
+        group_by (ty.Callable, optional): returns a key for configs that can be executed
+            together by `fn_execute_many`, or None. see `ipyrun.runmanifest`
+        fn_execute_many (ty.Callable, optional): executes a list of configs in one
+            process, returning a RunResult for each
+
+    Returns:
+        BatchResult
+    """
+    groups = {}
+    for c in configs:
+        k = group_by(c) if group_by is not None and fn_execute_many is not None else None
+        groups.setdefault(("group", k) if k is not None else ("config", c.key), []).append(c)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(groups) or 1))
+
+    def execute(k, configs):
+        if cancel is not None and cancel.is_set():
+            return [
+                RunResult(key=c.key, status="skipped", stdout=NOT_RUN_CANCELLED)
+                for c in configs
+            ]
+        if k[0] == "group":
+            return fn_execute_many(configs)
+        return [fn_execute(configs[0])]
+
+    start = time.time()
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(execute, k, v) for k, v in groups.items()]
+        for future in as_completed(futures):
+            for result in future.result():
+                results.append(result)
+                if on_complete is not None:
+                    on_complete(result)
+    return BatchResult(
+        results=results, wall_time=time.time() - start, max_workers=max_workers
+    )
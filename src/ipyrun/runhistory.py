@@ -0,0 +1,246 @@
+"""
+a persistent log of every run, appended to `fpth_runhistory` (a csv file in the run's
+`fdir_appdata`). each run appends a single line: start / end timestamps, duration,
+status, exit code, user, host, the rendered shell command, the hashes of the inputs
+and outputs and the resources used (see `ipyrun.runexec.ResourceUsage`). the file is only ever appended to, so writing is cheap however long the
+history gets.
+
+the history is read back a page at a time by streaming the file (see `read_history`),
+so it is never loaded into memory in full. `RunLogUi` is the paginated, filterable view
+shown by the `runlog` button.
+"""
+import io
+import csv
+import json
+import socket
+import getpass
+import datetime
+import pathlib
+import typing as ty
+
+import ipywidgets as widgets
+
+from ipyrun.runstatus import HASH_CACHE, HashCache
+
+HISTORY_FIELDS = [
+    "key",
+    "start",
+    "end",
+    "duration",
+    "status",
+    "returncode",
+    "user",
+    "host",
+    "shell",
+    "inputs",
+    "outputs",
+    "cpu_user",
+    "cpu_sys",
+    "max_rss",
+    "block_in",
+    "block_out",
+    "ctx_voluntary",
+    "ctx_involuntary",
+]
+PAGE_SIZE = 20
+
+
+def _user() -> str:
+    try:
+        return getpass.getuser()
+    except Exception:  # i.e. no username in the environment
+        return ""
+
+
+def _timestamp(t: ty.Optional[float]) -> str:
+    if t is None:
+        return ""
+    return datetime.datetime.fromtimestamp(t).isoformat(timespec="seconds")
+
+
+def _hashes(fpths, cache: HashCache) -> str:
+    di = {}
+    for f in fpths or []:
+        state = cache.file_state(f)
+        di[str(f)] = state.hash if state is not None else None
+    return json.dumps(di)
+
+
+def _resources(resources) -> ty.Dict[str, str]:
+    if resources is None:
+        return {}
+    return {
+        "cpu_user": f"{resources.user_time:.3f}",
+        "cpu_sys": f"{resources.sys_time:.3f}",
+        "max_rss": str(resources.max_rss),
+        "block_in": str(resources.block_in),
+        "block_out": str(resources.block_out),
+        "ctx_voluntary": str(resources.voluntary_switches),
+        "ctx_involuntary": str(resources.involuntary_switches),
+    }
+
+
+def history_row(config, result, cache: HashCache = HASH_CACHE) -> ty.Dict[str, str]:
+    """the runhistory.csv row of a finished run"""
+    return {
+        "key": config.key,
+        "start": _timestamp(result.start),
+        "end": _timestamp(result.end),
+        "duration": f"{result.duration:.3f}",
+        "status": result.status,
+        "returncode": "" if result.returncode is None else str(result.returncode),
+        "user": _user(),
+        "host": socket.gethostname(),
+        "shell": config.shell,
+        "inputs": _hashes(config.fpths_inputs, cache),
+        "outputs": _hashes(config.fpths_outputs, cache),
+        **_resources(result.resources),
+    }
+
+
+def append_history(fpth, row: ty.Dict[str, str]):
+    """appends the row as a single write, adding the header to a new file"""
+    fpth = pathlib.Path(fpth)
+    fpth.parent.mkdir(parents=True, exist_ok=True)
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=HISTORY_FIELDS, lineterminator="\n")
+    with open(fpth, "a", newline="") as f:
+        if f.tell() == 0:
+            writer.writeheader()
+        writer.writerow(row)
+        f.write(buf.getvalue())
+
+
+def record_history(config, result, cache: HashCache = HASH_CACHE):
+    if getattr(config, "fpth_runhistory", None) is None or result.start is None:
+        return
+    append_history(config.fpth_runhistory, history_row(config, result, cache=cache))
+
+
+def iter_history(fpth) -> ty.Iterator[ty.Dict[str, str]]:
+    """streams the rows of the history, oldest first"""
+    try:
+        f = open(fpth, newline="")
+    except OSError:
+        return
+    with f:
+        yield from csv.DictReader(f)
+
+
+def match_row(row: ty.Dict[str, str], query: str = "", status: str = "") -> bool:
+    """`query` is matched (case-insensitive) against every field"""
+    if status and row.get("status") != status:
+        return False
+    if query:
+        query = query.lower()
+        return any(query in v.lower() for v in row.values() if isinstance(v, str))
+    return True
+
+
+def read_history(
+    fpth, page: int = 0, page_size: int = PAGE_SIZE, query: str = "", status: str = ""
+) -> ty.Tuple[ty.List[ty.Dict[str, str]], int]:
+    """a page of the matching rows, newest first, and the number that match. the file
+    is streamed twice (count, then select) so only a page is held in memory"""
+    n = sum(1 for row in iter_history(fpth) if match_row(row, query, status))
+    stop = n - page * page_size
+    start = max(stop - page_size, 0)
+    rows = []
+    i = 0
+    if stop > 0:
+        for row in iter_history(fpth):
+            if not match_row(row, query, status):
+                continue
+            if start <= i < stop:
+                rows.append(row)
+            i += 1
+            if i >= stop:
+                break
+    return list(reversed(rows)), n
+
+
+def _html_table(rows: ty.List[ty.Dict[str, str]], fields: ty.List[str]) -> str:
+    esc = lambda s: (s or "").replace("&", "&amp;").replace("<", "&lt;")
+    head = "".join(f"<th>{f}</th>" for f in fields)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{esc(r.get(f))}</td>" for f in fields) + "</tr>"
+        for r in rows
+    )
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+
+class RunLogUi(widgets.VBox):
+    """paginated, filterable view of a runhistory.csv file, newest first. the input
+    and output hashes are not shown but can be filtered on"""
+
+    fields = [
+        "start",
+        "duration",
+        "status",
+        "returncode",
+        "cpu_user",
+        "cpu_sys",
+        "max_rss",
+        "user",
+        "host",
+        "shell",
+    ]
+
+    def __init__(self, fpth, page_size: int = PAGE_SIZE):
+        self.fpth = fpth
+        self.page_size = page_size
+        self.page = 0
+        self.n = 0
+        self.query = widgets.Text(placeholder="filter", layout={"width": "200px"})
+        self.status = widgets.Dropdown(
+            options=["", "success", "failed", "cancelled", "timed_out"],
+            layout={"width": "120px"},
+        )
+        self.newer = widgets.Button(
+            icon="chevron-left", tooltip="newer", layout={"width": "40px"}
+        )
+        self.older = widgets.Button(
+            icon="chevron-right", tooltip="older", layout={"width": "40px"}
+        )
+        self.label = widgets.HTML()
+        self.table = widgets.HTML()
+        super().__init__(
+            [
+                widgets.HBox(
+                    [self.query, self.status, self.newer, self.older, self.label]
+                ),
+                self.table,
+            ]
+        )
+        self.query.observe(self._filter, names="value")
+        self.status.observe(self._filter, names="value")
+        self.newer.on_click(lambda b: self.show(self.page - 1))
+        self.older.on_click(lambda b: self.show(self.page + 1))
+        self.show(0)
+
+    @property
+    def n_pages(self) -> int:
+        return max((self.n - 1) // self.page_size + 1, 1)
+
+    def _filter(self, on_change):
+        self.show(0)
+
+    def _read(self, page: int):
+        return read_history(
+            self.fpth,
+            page=page,
+            page_size=self.page_size,
+            query=self.query.value,
+            status=self.status.value,
+        )
+
+    def show(self, page: int):
+        page = max(page, 0)
+        rows, self.n = self._read(page)
+        self.page = min(page, self.n_pages - 1)
+        if self.page != page:  # i.e. past the end
+            rows, self.n = self._read(self.page)
+        self.newer.disabled = self.page == 0
+        self.older.disabled = self.page >= self.n_pages - 1
+        self.label.value = f"page {self.page + 1} of {self.n_pages} ({self.n} runs)"
+        self.table.value = _html_table(rows, self.fields)
@@ -0,0 +1,168 @@
+"""
+the batch config as an index of its runs. with `ConfigBatch.index_only` the batch file
+stores only the index fields of each run (key, index, long_name, status, in_batch and
+the run folder) and the full config of a run lives in its own folder
+(`fdir_appdata/config-shell_handler.json`). so each config is written once, and the
+batch file stays small however many runs it has.
+
+when loading, each index entry becomes a `LazyConfig` which answers the index fields
+from the entry and reads / validates the full config from the run folder on first use
+of any other field (i.e. when the RunApp is built or the run is executed). the time to
+load a batch then depends on the number of runs shown rather than the size of the batch.
+
+batches stored in full (`index_only=False`) are stored compactly: the fields with the
+same value in every run (e.g. `shell_template`, `call`, `autodisplay_definitions`) are
+stored once as `shared_config`, and each run stores only the rest (see `split_shared`).
+they are merged back into each run on load.
+"""
+import json
+import pathlib
+import typing as ty
+
+from ipyrun.constants import PATH_CONFIG
+from ipyrun.runsave import save_config
+
+INDEX_FIELDS = ["key", "index", "long_name", "status", "in_batch", "fdir_appdata"]
+
+
+def is_index_entry(v) -> bool:
+    return isinstance(v, dict) and "key" in v and set(v) <= set(INDEX_FIELDS)
+
+
+def can_index(config) -> bool:
+    """configs without a run folder must be stored in full"""
+    return getattr(config, "fdir_appdata", None) is not None
+
+
+def index_entry(config) -> ty.Dict[str, ty.Any]:
+    di = {k: getattr(config, k, None) for k in INDEX_FIELDS}
+    di["fdir_appdata"] = str(di["fdir_appdata"])
+    return di
+
+
+class LazyConfig:
+    """a run config read from its run folder on first use. see module docstring
+
+    Args:
+        entry (dict): the index fields of the run
+        cls_config: validates the full config
+        fdir_root (pathlib.Path): the root folder of the batch. resolved when the
+            LazyConfig is made, so loading doesn't depend on the cwd at the time
+    """
+
+    def __init__(self, entry: dict, cls_config, fdir_root):
+        entry = dict(entry)
+        entry["fdir_appdata"] = pathlib.Path(entry["fdir_appdata"])
+        object.__setattr__(self, "_entry", entry)
+        object.__setattr__(self, "_cls_config", cls_config)
+        object.__setattr__(self, "_fdir_root", pathlib.Path(fdir_root).resolve())
+        object.__setattr__(self, "_config", None)
+
+    @property
+    def loaded(self) -> bool:
+        return self._config is not None
+
+    def load(self):
+        """the validated config. the index fields take precedence over the run file,
+        as bulk changes (e.g. checking all runs) only save the batch. the BatchApp
+        re-saves the batch when the status or check of a single run changes, so the
+        index stays up-to-date (see `ipyrun.runui.BatchApp.save_index`)
+
+        Raises:
+            FileNotFoundError: if the run file is missing
+        """
+        if self._config is None:
+            fpth = self._fdir_root / self._entry["fdir_appdata"] / PATH_CONFIG
+            if not fpth.is_file():
+                raise FileNotFoundError(
+                    f"config of run `{self._entry['key']}` not found: {fpth}"
+                )
+            di = json.loads(fpth.read_text())
+            di["fdir_root"] = self._fdir_root
+            di.update({k: v for k, v in self._entry.items() if k != "long_name"})
+            object.__setattr__(self, "_config", self._cls_config(**di))
+        return self._config
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if self._config is None and name in self._entry:
+            return self._entry[name]
+        return getattr(self.load(), name)
+
+    def __setattr__(self, name, value):
+        if self._config is None and name in INDEX_FIELDS:
+            self._entry[name] = value
+        else:
+            setattr(self.load(), name, value)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"LazyConfig({self._entry['key']}, {state})"
+
+
+def load_config(config):
+    """the full config of a batch entry"""
+    if isinstance(config, LazyConfig):
+        return config.load()
+    return config
+
+
+def is_loaded(config) -> bool:
+    return not isinstance(config, LazyConfig) or config.loaded
+
+
+def make_configs(values: ty.List, cls_config, fdir_root) -> ty.List:
+    """index entries become LazyConfigs, full dicts are validated now"""
+    li = []
+    for v in values:
+        if is_index_entry(v):
+            li.append(LazyConfig(v, cls_config, fdir_root))
+        elif isinstance(v, dict):
+            li.append(cls_config(**v))
+        else:  # already a config
+            li.append(v)
+    return li
+
+
+def dump_configs(configs: ty.List, index_only: bool, mode: str = "python") -> ty.List:
+    if index_only:
+        return [
+            index_entry(c) if can_index(c) else load_config(c).model_dump(mode=mode)
+            for c in configs
+        ]
+    return [load_config(c).model_dump(mode=mode) for c in configs]
+
+
+def split_shared(
+    entries: ty.List[dict],
+) -> ty.Tuple[ty.Dict[str, ty.Any], ty.List[dict]]:
+    """the (serialized) fields with the same value in every entry, and the entries
+    without them. the index fields are always kept in the entries"""
+    if len(entries) < 2 or not all(isinstance(e, dict) for e in entries):
+        return {}, entries
+    first, rest = entries[0], entries[1:]
+    shared = {
+        k: v
+        for k, v in first.items()
+        if k not in INDEX_FIELDS and all(k in e and e[k] == v for e in rest)
+    }
+    return shared, [{k: v for k, v in e.items() if k not in shared} for e in entries]
+
+
+def merge_shared(shared: ty.Dict[str, ty.Any], entries: ty.List) -> ty.List:
+    if not shared:
+        return entries
+    return [{**shared, **e} if isinstance(e, dict) else e for e in entries]
+
+
+def save_batch(config):
+    """saves the batch. if it only holds an index, the loaded run configs are saved to
+    their own folders too (unchanged files are not re-written, see ipyrun.runsave)"""
+    save_config(config, config.fpth_config)
+    if not getattr(config, "index_only", False):
+        return
+    for c in config.configs:
+        if is_loaded(c) and can_index(c):
+            c = load_config(c)
+            save_config(c, c.fpth_config)
@@ -0,0 +1,138 @@
+"""
+an optional protocol for executing many runs of the same script in one process.
+
+rather than launching an interpreter per config, the runs of a batch that share a
+`path_run`, `pythonpath` and `call` are written to a manifest file and the script is
+called once with `--manifest <fpth>`. the script processes every entry in-process and
+writes a results file mapping each key to its status, e.g.
+
+    {"00-linegraph": {"status": "success"}, "01-linegraph": {"status": "failed", "message": "..."}}
+
+configs opt in with `use_manifest=True` (the script must support the protocol, see the
+`linegraph` example). entries missing from the results are marked as failed.
+"""
+import json
+import shutil
+import pathlib
+import tempfile
+import threading
+import typing as ty
+
+from pydantic import Field
+from ipyrun.basemodel import BaseModel
+from ipyrun.runexec import RunResult, execute_shell
+
+MANIFEST_FLAG = "--manifest"
+
+
+class ManifestEntry(BaseModel):
+    key: str
+    fpths_inputs: ty.List[pathlib.Path] = []
+    fpths_outputs: ty.List[pathlib.Path] = []
+    params: ty.Dict = {}
+
+
+class Manifest(BaseModel):
+    """the file passed to the script"""
+
+    runs: ty.List[ManifestEntry] = []
+    fpth_results: pathlib.Path = Field(
+        ..., description="the script writes the status of each run here"
+    )
+
+
+def manifest_group_key(config) -> ty.Optional[ty.Tuple[str, str, str]]:
+    """configs with the same key can be executed from one manifest"""
+    if not getattr(config, "use_manifest", False):
+        return None
+    return (str(config.path_run), str(config.pythonpath), config.call)
+
+
+def _read_results(fpth_results: pathlib.Path) -> ty.Dict[str, dict]:
+    try:
+        return json.loads(fpth_results.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def execute_manifest(
+    configs: ty.List,
+    on_output: ty.Optional[ty.Callable[[str], ty.Any]] = None,
+    cancel: ty.Optional[threading.Event] = None,
+    fn_execute: ty.Callable = execute_shell,
+) -> ty.List[RunResult]:
+    """execute all the configs in one process using a manifest.
+
+    Args:
+        configs (ty.List[ConfigShell]): configs sharing a `manifest_group_key`
+        on_output (ty.Callable, optional): called with each line of output of the process
+        cancel (threading.Event, optional): set to kill the process
+        fn_execute (ty.Callable, optional): executes the process. defaults to execute_shell
+
+    Returns:
+        ty.List[RunResult]: one per config
+    """
+    first = configs[0]
+    fdir = pathlib.Path(tempfile.mkdtemp(prefix="ipyrun-manifest-"))
+    try:
+        fpth_manifest = fdir / "manifest.json"
+        manifest = Manifest(
+            runs=[
+                ManifestEntry(
+                    key=c.key,
+                    fpths_inputs=c.fpths_inputs or [],
+                    fpths_outputs=c.fpths_outputs or [],
+                    params=c.params or {},
+                )
+                for c in configs
+            ],
+            fpth_results=fdir / "results.json",
+        )
+        manifest.file(fpth_manifest)
+        timeouts = [getattr(c, "timeout", None) for c in configs]
+        job = first.model_copy(
+            update=dict(
+                key=f"{first.run} ({len(configs)} runs)",
+                shell=f"{first.call} {first.run} {MANIFEST_FLAG} {fpth_manifest}",
+                fpth_console=None,
+                timeout=None if None in timeouts else sum(timeouts),
+            )
+        )
+        job_result = fn_execute(job, on_output=on_output, cancel=cancel)
+        di = _read_results(manifest.fpth_results)
+    finally:
+        shutil.rmtree(fdir, ignore_errors=True)
+
+    # the script can report the duration of each run, otherwise the time is shared
+    durations = {
+        c.key: di.get(c.key, {}).get("duration", job_result.duration / len(configs))
+        for c in configs
+    }
+    total = sum(durations.values())
+    results = []
+    for c in configs:
+        entry = di.get(c.key, {})
+        if not entry:
+            status = job_result.status if not job_result.ok else "failed"
+            message = f"no result for {c.key} in manifest results\n" + job_result.stdout
+        else:
+            status = "success" if entry.get("status") == "success" else "failed"
+            message = entry.get("message", "")
+        duration = durations[c.key]
+        resources = job_result.resources
+        if resources is not None:  # shared in proportion to the duration
+            resources = resources.share(
+                duration / total if total > 0 else 1 / len(configs)
+            )
+        results.append(
+            RunResult(
+                key=c.key,
+                status=status,
+                returncode=job_result.returncode,
+                start=job_result.start,
+                end=job_result.start + duration,
+                stdout=message,
+                resources=resources,
+            )
+        )
+    return results
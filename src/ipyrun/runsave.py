@@ -0,0 +1,119 @@
+"""
+write-behind saving of configs. `save_config` marks a config as dirty and returns
+straight away; the dirty configs are written together, on a background thread, once no
+further saves have arrived for `debounce` seconds. so checking 100 runs, or updating
+the status of a batch, writes each file once rather than once per change.
+
+each write is atomic (temp file + fsync + rename) so a crash mid-write leaves the
+previous file intact, and is skipped if the serialized content is unchanged since the
+last write. `flush` writes whatever is pending immediately, e.g. before a config is
+read back from disk. pending saves are flushed at exit.
+"""
+import os
+import atexit
+import hashlib
+import pathlib
+import tempfile
+import threading
+import typing as ty
+
+DEBOUNCE = 0.25
+
+
+def write_atomic(fpth, text: str):
+    """writes to a temp file in the same folder then renames it over `fpth`"""
+    fpth = pathlib.Path(fpth)
+    fd, tmp = tempfile.mkstemp(dir=fpth.parent, prefix=f".{fpth.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, fpth)
+    except BaseException:
+        pathlib.Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class ConfigSaver:
+    """coalesces saves of configs (pydantic models) into debounced, atomic writes
+
+    Args:
+        debounce (float, optional): seconds without a save before the pending configs
+            are written. 0 writes on every save (synchronously)
+    """
+
+    def __init__(self, debounce: float = DEBOUNCE):
+        self.debounce = debounce
+        self.n_saves = 0  # calls to save
+        self.n_writes = 0  # files written
+        self.n_skipped = 0  # flushed but unchanged
+        self._pending: ty.Dict[str, ty.Any] = {}  # {fpth: config}
+        self._written: ty.Dict[str, ty.Tuple[str, int]] = {}  # {fpth: (hash, mtime)}
+        self._timer: ty.Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def save(self, config, fpth):
+        fpth = os.path.abspath(fpth)  # the cwd may have changed by the time of writing
+        with self._lock:
+            self._pending[fpth] = config
+            self.n_saves += 1
+            if self.debounce > 0:
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._timer = threading.Timer(self.debounce, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if self.debounce <= 0:
+            self.flush(fpth)
+
+    @property
+    def pending(self) -> ty.List[str]:
+        return list(self._pending)
+
+    def flush(self, fpth=None):
+        """writes the pending configs now (only `fpth` if given)"""
+        with self._lock:
+            if fpth is None:
+                pending, self._pending = self._pending, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            else:
+                fpth = os.path.abspath(fpth)
+                config = self._pending.pop(fpth, None)
+                pending = {} if config is None else {fpth: config}
+        with self._write_lock:
+            for f, config in pending.items():
+                self._write(f, config.model_dump_json(indent=4))
+
+    def _write(self, fpth: str, text: str):
+        h = hashlib.sha256(text.encode()).hexdigest()
+        written = self._written.get(fpth)
+        try:
+            mtime = os.stat(fpth).st_mtime_ns
+        except OSError:
+            mtime = None
+        if written is not None and written == (h, mtime):
+            self.n_skipped += 1
+            return
+        pathlib.Path(fpth).parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(fpth, text)
+        self._written[fpth] = (h, os.stat(fpth).st_mtime_ns)
+        self.n_writes += 1
+
+
+SAVER = ConfigSaver()
+atexit.register(SAVER.flush)
+
+
+def save_config(config, fpth, saver: ConfigSaver = SAVER):
+    """marks `config` to be written to `fpth`. see ConfigSaver"""
+    if fpth is None:
+        return
+    saver.save(config, fpth)
+
+
+def flush_configs(saver: ConfigSaver = SAVER):
+    saver.flush()
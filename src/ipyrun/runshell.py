@@ -36,23 +36,35 @@ if __name__ == "__main__":
 import os
 import sys
 import io
+import time
+import asyncio
+import threading
 import typing as ty
 import shutil
 import pathlib
 import functools
 import subprocess
+import contextlib
+import contextvars
 import stringcase
-from jinja2 import Template
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from jinja2 import Template, meta
 from markdown import markdown
 import json
+import hashlib
 import logging
 import importlib
+import traceback
 
 # object models
+from pydantic_core import to_json, PydanticSerializationError
 from pydantic import (
     validator,
     Field,
     field_validator,
+    field_serializer,
+    model_serializer,
     ValidationInfo,
     ValidationError,
     BaseModel,
@@ -126,18 +138,62 @@ class PyObj(BaseModel):
         return info.data["path"].stem
 
 
-def load_PyObj(obj: PyObj):
+class PyObjCache:
+    """objects loaded by `load_PyObj`, keyed by (path, module_name, obj_name). the
+    module is only re-executed when the hash of its source changes (hashes are cached
+    on size / mtime, see ipyrun.runstatus.HashCache)"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._cache: ty.Dict[tuple, ty.Tuple[str, ty.Any]] = {}  # {key: (hash, obj)}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, fpth: pathlib.Path, fn_load: ty.Callable):
+        state = HASH_CACHE.file_state(fpth)
+        h = state.hash if state is not None else None
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and h is not None and cached[0] == h:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        obj = fn_load()
+        with self._lock:
+            self._cache[key] = (h, obj)
+        return obj
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits, self.misses = 0, 0
+
+    def cache_info(self) -> ty.Dict[str, int]:
+        return dict(hits=self.hits, misses=self.misses, size=len(self._cache))
+
+
+PYOBJ_CACHE = PyObjCache()
+
+
+def load_PyObj(obj: PyObj, cache: ty.Optional[PyObjCache] = PYOBJ_CACHE):
     submodule_search_locations = None
     p = obj.path
     if obj.path.is_dir():
         p = p / "__main__.py"
         submodule_search_locations = []
-    spec = importlib.util.spec_from_file_location(
-        obj.module_name, p, submodule_search_locations=submodule_search_locations
-    )
-    foo = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(foo)
-    return getattr(foo, obj.obj_name)
+
+    def load():
+        spec = importlib.util.spec_from_file_location(
+            obj.module_name, p, submodule_search_locations=submodule_search_locations
+        )
+        foo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(foo)
+        return getattr(foo, obj.obj_name)
+
+    if cache is None:
+        return load()
+    key = (str(pathlib.Path(p).resolve()), obj.module_name, obj.obj_name)
+    return cache.get(key, p, load)
 
 
 def create_pydantic_json_file(
@@ -170,6 +226,65 @@ def create_pydantic_json_file(
     return path
 
 
+class DeferredEffects:
+    """the filesystem side effects of validating DefaultConfigShells (changing dir,
+    making the run folder and writing default input files), collected within
+    `defer_side_effects` and applied together in one pass rather than per config"""
+
+    def __init__(self):
+        self.fdir_root: ty.Optional[pathlib.Path] = None  # absolute
+        self.fdirs: ty.List[pathlib.Path] = []
+        self.files: ty.Dict[pathlib.Path, PyObj] = {}  # created if missing
+
+    @property
+    def root(self) -> pathlib.Path:
+        return self.fdir_root if self.fdir_root is not None else pathlib.Path.cwd()
+
+    def chdir(self, fdir):
+        self.fdir_root = (self.root / fdir).resolve()
+
+    def apply(self, max_workers: ty.Optional[int] = None):
+        """independent mkdir / stat / write calls are made concurrently. the default
+        input json is made once per schema"""
+        if self.fdir_root is not None and self.fdir_root != pathlib.Path.cwd():
+            os.chdir(self.fdir_root)
+        with ThreadPoolExecutor(max_workers or SCAN_WORKERS) as pool:
+            fdirs = list(dict.fromkeys(self.fdirs))
+            list(pool.map(lambda p: p.mkdir(exist_ok=True), fdirs))
+            paths = list(self.files)
+            exists = pool.map(os.path.isfile, paths)
+            missing = [p for p, e in zip(paths, exists) if not e]
+            texts = {}
+            for p in missing:
+                k = (str(self.files[p].path), self.files[p].obj_name)
+                if k not in texts:
+                    texts[k] = load_PyObj(self.files[p])().model_dump_json(indent=4)
+            write = lambda p: p.write_text(
+                texts[(str(self.files[p].path), self.files[p].obj_name)],
+                encoding="utf-8",
+            )
+            list(pool.map(write, missing))
+
+
+_DEFERRED: contextvars.ContextVar = contextvars.ContextVar("deferred", default=None)
+
+
+@contextlib.contextmanager
+def defer_side_effects(max_workers: ty.Optional[int] = None):
+    """configs validated within this are validated as data only, their side effects
+    are applied together on exit (see DeferredEffects). re-entrant"""
+    if _DEFERRED.get() is not None:
+        yield _DEFERRED.get()
+        return
+    effects = DeferredEffects()
+    token = _DEFERRED.set(effects)
+    try:
+        yield effects
+    finally:
+        _DEFERRED.reset(token)
+    effects.apply(max_workers=max_workers)
+
+
 # ---------------------------------------------------
 # ---------------------------------------------------
 
@@ -184,10 +299,52 @@ from ipyrun.actions import (
 )
 from ipyrun.basemodel import BaseModel
 from ipyrun._utils import get_status
+from ipyrun.runexec import (
+    udpate_env,
+    execute_shell,
+    execute_shell_async,
+    schedule,
+    OutputStreamer,
+    RunResult,
+)
+from ipyrun.rundag import execute_dag
+from ipyrun.runworkers import execute_warm
+from ipyrun.runmanifest import execute_manifest, manifest_group_key
+from ipyrun.runstatus import (
+    HASH_CACHE,
+    SCAN_WORKERS,
+    RunRecord,
+    early_cutoff,
+    file_states,
+    get_status_from_content,
+    save_run_record,
+    scan_batch_status,
+)
+from ipyrun.runwatch import StatusWatcher, build_path_map
+from ipyrun.runhistory import RunLogUi, record_history
+from ipyrun.runsave import save_config, flush_configs
+from ipyrun.runindex import (
+    dump_configs,
+    is_loaded,
+    make_configs,
+    merge_shared,
+    save_batch,
+    split_shared,
+)
+from ipyrun.runcache import (
+    MAX_BYTES,
+    cache_key,
+    execute_cached,
+    get_run_cache,
+    restore_run,
+    store_run,
+)
 from ipyrun.constants import (
     PATH_CONFIG,
     PATH_RUNHISTORY,
     PATH_LOG,
+    PATH_CONSOLE,
+    PATH_RUNRECORD,
     FPTH_EXAMPLE_INPUTSCHEMA,
     DI_STATUS_MAP,
 )
@@ -247,13 +404,126 @@ class AutoDisplayDefinition(PyObj):
     ext: str
 
 
-from ipyautoui.autoui import get_autodisplay_map
+from ipyautoui.autoui import get_autodisplay_map, get_autoui
 
 
-def create_autodisplay_map(ddf: AutoDisplayDefinition, **kwargs):
+class RendererRegistry:
+    """the AutoUi (see `ipyautoui.autoui.get_autoui`) of each unique (schema, ext,
+    kwargs), built once and shared by every RunApp that displays that schema. the
+    per-app kwargs (`fns_onsave`) are only bound when the renderer is made"""
+
+    per_app_kwargs = ("fns_onsave",)
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._uis: ty.Dict[tuple, ty.Callable] = {}
+        self._lock = threading.Lock()
+
+    def get_ui(self, schema, ext: str, **kwargs) -> ty.Callable:
+        key = (schema, ext, json.dumps(kwargs, sort_keys=True, default=str))
+        with self._lock:
+            if key in self._uis:
+                self.hits += 1
+                return self._uis[key]
+            self.misses += 1
+        ui = get_autoui(schema, **kwargs)
+        with self._lock:
+            return self._uis.setdefault(key, ui)
+
+    def get_autodisplay_map(self, schema, ext=".json", **kwargs):
+        """as `ipyautoui.autoui.get_autodisplay_map` but with a shared AutoUi"""
+        shared = {k: v for k, v in kwargs.items() if k not in self.per_app_kwargs}
+        ui = self.get_ui(schema, ext, **shared)
+
+        def renderer(path: pathlib.Path):
+            _ui = ui(value=None, **kwargs)
+            _ui.path = path
+            _ui.load_file(path)
+            _ui.savebuttonbar.unsaved_changes = False
+            return _ui
+
+        return {ext: renderer}
+
+    def cache_info(self) -> ty.Dict[str, int]:
+        return dict(hits=self.hits, misses=self.misses, size=len(self._uis))
+
+
+RENDERERS = RendererRegistry()
+
+
+def create_autodisplay_map(
+    ddf: AutoDisplayDefinition,
+    registry: ty.Optional[RendererRegistry] = RENDERERS,
+    **kwargs,
+):
     model = load_PyObj(ddf)
     kwargs = kwargs | dict(show_savebuttonbar=True)
-    return get_autodisplay_map(schema=model, ext=ddf.ext, **kwargs)
+    if registry is None:
+        return get_autodisplay_map(schema=model, ext=ddf.ext, **kwargs)
+    return registry.get_autodisplay_map(schema=model, ext=ddf.ext, **kwargs)
+
+
+TEMPLATE_CACHE_SIZE = 128
+RENDER_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(text: str) -> Template:
+    return Template(text)
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def template_fields(text: str) -> ty.FrozenSet[str]:
+    """the variables referenced by the template"""
+    env = compile_template(text).environment
+    return frozenset(meta.find_undeclared_variables(env.parse(text)))
+
+
+class ShellRenderer:
+    """renders shell templates with compiled templates (see `compile_template`),
+    keeping the least recently used `maxsize` results keyed on the template and a hash
+    of the (json serialized) values of the fields it references. so a config is only
+    re-rendered when one of those fields has changed. values that can't be serialized
+    are rendered without caching"""
+
+    def __init__(self, maxsize: int = RENDER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._rendered: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str, data: dict) -> ty.Optional[tuple]:
+        values = {k: data.get(k) for k in sorted(template_fields(text))}
+        try:
+            return (text, hashlib.sha256(to_json(values)).hexdigest())
+        except PydanticSerializationError:
+            return None
+
+    def render(self, text: str, data: dict) -> str:
+        key = self._key(text, data)
+        if key is None:
+            return compile_template(text).render(**data)
+        with self._lock:
+            if key in self._rendered:
+                self._rendered.move_to_end(key)
+                self.hits += 1
+                return self._rendered[key]
+            self.misses += 1
+        rendered = compile_template(text).render(**data)
+        with self._lock:
+            self._rendered[key] = rendered
+            while len(self._rendered) > self.maxsize:
+                self._rendered.popitem(last=False)
+        return rendered
+
+    def cache_info(self) -> ty.Dict[str, int]:
+        return dict(hits=self.hits, misses=self.misses, size=len(self._rendered))
+
+
+SHELL_RENDERER = ShellRenderer()
 
 
 # class BaseConfigShell(BaseModel):
@@ -311,6 +581,55 @@ class ConfigShell(BaseModel):
             " filepaths defined within the input filepaths"
         ),
     )
+    run_async: bool = Field(
+        default=False,
+        description=(
+            "run the shell command without blocking the kernel. the UI remains usable"
+            " and is updated when the process finishes"
+        ),
+    )
+    use_warm_worker: bool = Field(
+        default=False,
+        description=(
+            "execute `python -m <run>` in a fork of a long-lived worker process that has"
+            " already imported `preload_modules`, avoiding interpreter startup and import"
+            " costs. falls back to a subprocess where os.fork is unavailable"
+        ),
+    )
+    preload_modules: List[str] = Field(
+        default_factory=list,
+        description="modules imported once by the warm worker, e.g. numpy, pandas",
+    )
+    use_run_cache: bool = Field(
+        default=False,
+        description=(
+            "restore the outputs from a cache if the run has been executed before with"
+            " the same input content, path_run source, params, call and shell. see"
+            " ipyrun.runcache"
+        ),
+    )
+    fdir_run_cache: ty.Optional[pathlib.Path] = Field(
+        None, description="defaults to ~/.cache/ipyrun/runcache"
+    )
+    run_cache_max_bytes: int = Field(
+        MAX_BYTES, description="least recently used outputs are evicted above this size"
+    )
+    run_cache_link: bool = Field(
+        default=False,
+        description="restore outputs as hardlinks to the cache rather than copies",
+    )
+    use_manifest: bool = Field(
+        default=False,
+        description=(
+            "when run in a batch, runs sharing the same path_run, pythonpath and call are"
+            " executed by one process that is passed a manifest of all the runs. the"
+            " script must support `--manifest`, see ipyrun.runmanifest"
+        ),
+    )
+    timeout: ty.Optional[float] = Field(
+        default=None,
+        description="seconds after which the run is killed. None for no limit",
+    )
     autodisplay_definitions: List[AutoDisplayDefinition] = Field(
         default_factory=list,
         description="autoui definitions for displaying files. see ipyautoui",
@@ -333,8 +652,46 @@ class ConfigShell(BaseModel):
         ),
         # const=True
     )
-    fpth_runhistory: pathlib.Path = Field(PATH_RUNHISTORY)  # ,const=True
+    fpth_runhistory: ty.Optional[pathlib.Path] = Field(
+        None, description="every run is appended to this csv. see ipyrun.runhistory"
+    )
     fpth_log: ty.Optional[pathlib.Path] = Field(None)  # ,const=True
+    fpth_console: ty.Optional[pathlib.Path] = Field(
+        None, description="the full stdout / stderr of the last run is saved here"
+    )
+    fpth_runrecord: ty.Optional[pathlib.Path] = Field(
+        None,
+        description=(
+            "record of the content of the inputs etc. of the last successful run. see"
+            " ipyrun.runstatus"
+        ),
+    )
+    status_by_content: bool = Field(
+        default=True,
+        description=(
+            "outputs are out-of-date if the content of the inputs, the path_run source,"
+            " params or shell have changed since the last run (rather than comparing"
+            " modification times)"
+        ),
+    )
+    early_cutoff: bool = Field(
+        default=False,
+        description=(
+            "outputs that a re-run leaves unchanged keep their previous modification"
+            " time, so runs that use them as inputs stay up-to-date. opt-in, as it"
+            " rewrites the mtime of output files. requires status_by_content. only"
+            " helps downstream runs whose status is from modification times (i.e."
+            " status_by_content=False, or without a run record yet): those with"
+            " status_by_content compare content, so are unaffected by it"
+        ),
+    )
+    depends_on: List[str] = Field(
+        default_factory=list,
+        description=(
+            "keys of other runs in the batch that must run before this one. dependencies"
+            " are also inferred where fpths_inputs match the fpths_outputs of another run"
+        ),
+    )
     call: str = Field("python -O", validate_default=True)
     params: Dict = {}
     shell_template: str = """\
@@ -463,7 +820,11 @@ class DefaultConfigShell(ConfigShell):
     def _fdir_root(cls, v, info: ValidationInfo):
         if v is None:
             v = pathlib.Path(".")
-        os.chdir(str(v))  # TODO: this will fail if the code is run twice...?
+        deferred = _DEFERRED.get()
+        if deferred is not None:
+            deferred.chdir(v)
+        else:
+            os.chdir(str(v))  # TODO: this will fail if the code is run twice...?
         v = pathlib.Path(".")
         return v
         # TODO: Tasks pending completion -@jovyan at 9/29/2022, 11:51:24 AM
@@ -472,7 +833,11 @@ class DefaultConfigShell(ConfigShell):
     @field_validator("fdir_appdata")
     def _fdir_appdata(cls, v, info: ValidationInfo):
         v = info.data["fdir_root"] / info.data["key"]
-        v.mkdir(exist_ok=True)
+        deferred = _DEFERRED.get()
+        if deferred is not None:
+            deferred.fdirs.append(deferred.root / v)
+        else:
+            v.mkdir(exist_ok=True)
         return pathlib.Path(info.data["key"])
 
     @field_validator("fpths_inputs")
@@ -491,8 +856,11 @@ class DefaultConfigShell(ConfigShell):
                     / ("in-" + info.data["key"] + ddf.ext)
                     for ddf in ddfs
                 ]
+                deferred = _DEFERRED.get()
                 for ddf, path in zip(ddfs, paths):
-                    if not path.is_file():
+                    if deferred is not None:
+                        deferred.files[deferred.root / path] = ddf
+                    elif not path.is_file():
                         create_pydantic_json_file(ddf, path)  # TODO: remove from here?
                 v = [p.relative_to(info.data["fdir_root"]) for p in paths]
 
@@ -522,6 +890,16 @@ class DefaultConfigShell(ConfigShell):
         v = info.data["fdir_root"] / info.data["fdir_appdata"] / PATH_LOG
         return v.relative_to(info.data["fdir_root"])
 
+    @field_validator("fpth_console")
+    def _fpth_console(cls, v, info: ValidationInfo):
+        v = info.data["fdir_root"] / info.data["fdir_appdata"] / PATH_CONSOLE
+        return v.relative_to(info.data["fdir_root"])
+
+    @field_validator("fpth_runrecord")
+    def _fpth_runrecord(cls, v, info: ValidationInfo):
+        v = info.data["fdir_root"] / info.data["fdir_appdata"] / PATH_RUNRECORD
+        return v.relative_to(info.data["fdir_root"])
+
     @field_validator("params")
     def _params(cls, v, info: ValidationInfo):
         if info.data["fpth_params"] is not None:
@@ -535,23 +913,12 @@ class DefaultConfigShell(ConfigShell):
 
     @field_validator("shell")
     def _shell(cls, v, info: ValidationInfo):
-        return Template(info.data["shell_template"]).render(**info.data)
+        return SHELL_RENDERER.render(info.data["shell_template"], info.data)
 
 
 # -
 
 
-def udpate_env(append_to_pythonpath: str):
-    env = os.environ.copy()
-    if not "PYTHONPATH" in env.keys():
-        env["PYTHONPATH"] = str(append_to_pythonpath)
-    else:
-        env["PYTHONPATH"] = (
-            env["PYTHONPATH"] + f"{os.pathsep}{str(append_to_pythonpath)}"
-        )
-    return env
-
-
 def run(config: Type[ConfigShell]):
     save = sys.stdout
     sys.stdout = io.StringIO()
@@ -602,10 +969,16 @@ def update_status(app, fn_saveconfig):
     logging.info("update_status")
     if app is None:
         print("update status requires an app object to update the UI")
-    st = app.actions.get_status()
+    set_status(app, fn_saveconfig, app.actions.get_status())
+
+
+def set_status(app, fn_saveconfig, st):
+    """sets the status of the run, saving the config only if it has changed"""
+    changed = app.config.status != st
+    app.config.status = st  # before the ui, which the batch observes to save its index
     app.status = st  # .ui
-    app.config.status = st
-    fn_saveconfig()
+    if changed:
+        fn_saveconfig()
 
 
 def make_run_hide(fn_on_click):
@@ -618,22 +991,64 @@ def make_run_hide(fn_on_click):
     return run_hide
 
 
-def run_shell(app=None, display_hide_btn=True):
-    """
-    app=None
-    """
+def make_run_cancel(fn_on_click, tooltip="cancel run"):
+    run_cancel = widgets.Button(
+        layout={"width": BUTTON_WIDTH_MIN},
+        icon="stop",
+        button_style="warning",
+        tooltip=tooltip,
+    )
+    run_cancel.on_click(lambda click: fn_on_click())
+    return run_cancel
+
+
+def cancel_run(app=None):
+    """kills the running process of the RunApp (if any). for a BatchApp the remaining
+    runs are cancelled and the running ones killed"""
+    runs = getattr(app, "di_runs", {})
+    for a in [app, *runs.values()]:
+        cancel_event = getattr(a, "cancel_event", None)
+        if cancel_event is not None:
+            cancel_event.set()
+
+
+def set_status_from_result(app, result):
+    """cancelled and timed out runs are given their own status, otherwise the status
+    is re-evaluated from the files"""
+    if result.status in ("cancelled", "timed_out"):
+        app.config.status = result.status
+        app.status = result.status
+        app.actions.save_config()
+    else:
+        app.actions.update_status()
+    if result.resources is not None:
+        app.status_indicator.tooltip = (
+            f"{DI_STATUS_MAP[app.status]['tooltip']}\n{result.resources.summary()}"
+        )
+
+
+def _start_run_shell(app, display_hide_btn=True):
+    """shared preamble of run_shell and run_shell_async. returns a started spinner,
+    or None if there is nothing to run"""
     if app.config.update_config_at_runtime:
         app.config = app.config
         # ^  this updates config and remakes run actions using the setter.
         #    useful if, for example, output fpths dependent on contents of input files
-    if display_hide_btn:
-        run_hide = make_run_hide(app._run_hide)  # button to hide the run console
-        display(run_hide)
     print(f"run { app.config.key}")
     if app.status == "up_to_date":
+        if display_hide_btn:
+            display(make_run_hide(app._run_hide))  # button to hide the run console
         print(f"already up-to-date")
         # clear_output()
-        return
+        return None
+    app.cancel_event = threading.Event()
+    if display_hide_btn:
+        run_hide = make_run_hide(app._run_hide)  # button to hide the run console
+        if app.config.run_async:  # otherwise the kernel is busy until the run is done
+            run_cancel = make_run_cancel(app.actions.cancel)
+            display(widgets.HBox([run_hide, run_cancel]))
+        else:
+            display(run_hide)
     shell = app.config.shell.split(" ")
     pr = """
     """.join(
@@ -642,24 +1057,122 @@ def run_shell(app=None, display_hide_btn=True):
     display(Markdown(f"{pr}"))
     spinner = HaloNotebook(animation="marquee", text="Running", spinner="dots")
     # display(SVG(string_svg))
-    env = None
-    if app.config.pythonpath is not None:
-        env = udpate_env(app.config.pythonpath)
-    try:
-        spinner.start()
-        save = sys.stdout
-        sys.stdout = io.StringIO()
-        proc = subprocess.Popen(shell, env=env)
-        proc.wait()
-        in_stdout = sys.stdout.getvalue()
-        sys.stdout = save
-        display(in_stdout)
+    spinner.start()
+    return spinner
+
+
+def get_fn_execute(config, use_run_cache=True):
+    """the function that executes the shell command of a config"""
+    fn_execute = execute_warm if config.use_warm_worker else execute_shell
+    if use_run_cache and config.use_run_cache:
+        return wrapped_partial(execute_cached, fn_execute=fn_execute)
+    return fn_execute
+
+
+def snapshot_run(config) -> ty.Optional[RunRecord]:
+    """taken before executing the config and saved by `record_run` if it succeeds"""
+    if config.status_by_content:
+        return RunRecord.from_config(config)
+    return None
+
+
+def record_run(config, result, snapshot):
+    if snapshot is not None and result.status == "success":
+        if config.early_cutoff:
+            snapshot.outputs = early_cutoff(config, snapshot)
+        else:
+            snapshot.outputs = file_states(config.fpths_outputs, HASH_CACHE)
+        snapshot.resources = result.resources
+        save_run_record(config, snapshot)
+    record_history(config, result)
+
+
+def stream_to_console(app):
+    """rate-limited streaming of process output into the RunApp console"""
+    return OutputStreamer(app.out_console.append_stdout)
+
+
+def _finish_run_shell(app, result, spinner, streamer):
+    streamer.close(fpth_console=result.fpth_console)
+    if result.ok:
         spinner.succeed("Finished")
-    except subprocess.CalledProcessError as e:
-        print("error")
+    elif result.status == "cancelled":
+        spinner.warn("Cancelled")
+    elif result.status == "timed_out":
+        spinner.warn(f"Timed out after {app.config.timeout}s")
+    else:
         spinner.fail("Error with Process")
     spinner.stop()
-    app.actions.update_status()
+    set_status_from_result(app, result)
+
+
+def run_shell(app=None, display_hide_btn=True):
+    """
+    app=None
+    """
+    spinner = _start_run_shell(app, display_hide_btn=display_hide_btn)
+    if spinner is None:
+        return
+    streamer = stream_to_console(app)
+    fn_execute = get_fn_execute(app.config)
+    snapshot = snapshot_run(app.config)
+    result = fn_execute(app.config, on_output=streamer, cancel=app.cancel_event)
+    record_run(app.config, result, snapshot)
+    _finish_run_shell(app, result, spinner, streamer)
+    return result
+
+
+def run_shell_async(app=None, display_hide_btn=True):
+    """as run_shell, but the process is awaited on the kernel's event loop. returns
+    the scheduled asyncio.Task immediately, the spinner, status and console are
+    updated when the process finishes. as nothing awaits the task, errors are written
+    to the console and the run is marked as failed rather than raised."""
+    task = getattr(app, "run_task", None)
+    if task is not None and not task.done():
+        print(f"{app.config.key} is already running")
+        return task
+    spinner = _start_run_shell(app, display_hide_btn=display_hide_btn)
+    if spinner is None:
+        return
+
+    async def _run():
+        streamer = stream_to_console(app)
+        start = time.time()
+        result = None
+        try:
+            snapshot = snapshot_run(app.config)
+            key = None
+            if get_run_cache(app.config) is not None:
+                key = cache_key(app.config)
+            result = restore_run(app.config, on_output=streamer, key=key)
+            if result is None and app.config.use_warm_worker:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    None, execute_warm, app.config, streamer, app.cancel_event
+                )
+            elif result is None:
+                result = await execute_shell_async(
+                    app.config, on_output=streamer, cancel=app.cancel_event
+                )
+            store_run(app.config, result, key=key)
+            record_run(app.config, result, snapshot)
+        except Exception:
+            streamer(f"\n{traceback.format_exc()}")
+            result = RunResult(
+                key=app.config.key, status="failed", start=start, end=time.time()
+            )
+        except BaseException:  # i.e. the task was cancelled
+            result = RunResult(
+                key=app.config.key, status="cancelled", start=start, end=time.time()
+            )
+            raise
+        finally:
+            with app.out_console:
+                _finish_run_shell(app, result, spinner, streamer)
+        return result
+
+    app.run_task = schedule(_run())
+    return app.run_task
 
 
 class BaseShell(BaseModel):
@@ -689,7 +1202,7 @@ class RunShellActions(DefaultRunActions, BaseShell):
     def _save_config(cls, v, info: ValidationInfo):
         if info.data["config"] is not None:
             return wrapped_partial(
-                info.data["config"].file, info.data["config"].fpth_config
+                save_config, info.data["config"], info.data["config"].fpth_config
             )
 
     @field_validator("check")
@@ -702,6 +1215,8 @@ class RunShellActions(DefaultRunActions, BaseShell):
 
     @field_validator("get_status")
     def _get_status(cls, v, info: ValidationInfo):
+        if info.data["config"].status_by_content:
+            return wrapped_partial(get_status_from_content, info.data["config"])
         return wrapped_partial(
             get_status,
             info.data["config"].fpths_inputs,
@@ -756,11 +1271,19 @@ class RunShellActions(DefaultRunActions, BaseShell):
 
     @field_validator("run")
     def _run(cls, v, info: ValidationInfo):
+        if info.data["config"] is not None and info.data["config"].run_async:
+            return wrapped_partial(run_shell_async, app=info.data["app"])
         return wrapped_partial(run_shell, app=info.data["app"])
 
+    @field_validator("cancel")
+    def _cancel(cls, v, info: ValidationInfo):
+        return wrapped_partial(cancel_run, app=info.data["app"])
+
     @field_validator("runlog_show")
     def _runlog_show(cls, v, info: ValidationInfo):
-        return None  # TODO: add logging!
+        if info.data["config"] is None or info.data["config"].fpth_runhistory is None:
+            return None
+        return wrapped_partial(RunLogUi, info.data["config"].fpth_runhistory)
 
     @field_validator("load_show")
     def _load_show(cls, v, info: ValidationInfo):
@@ -832,7 +1355,56 @@ class ConfigBatch(BaseModel):
         exclude=True,
         validate_default=True,
     )
+    shared_config: ty.Dict[str, ty.Any] = Field(
+        default={},
+        description=(
+            "fields with the same value in every run config, stored once rather than"
+            " in each run. set when saving, see ipyrun.runindex"
+        ),
+    )
     configs: List = []
+    max_workers: ty.Optional[int] = Field(
+        default=None,
+        description=(
+            "max number of runs executed concurrently by run_batch."
+            " defaults to the number of CPUs. set to 1 to run one at a time"
+        ),
+    )
+    run_async: bool = Field(
+        default=False,
+        description=(
+            "run the batch without blocking the kernel. the UI remains usable (e.g. to"
+            " cancel the remaining runs) and is updated as each run finishes"
+        ),
+    )
+    max_live_runs: ty.Optional[int] = Field(
+        default=20,
+        description=(
+            "the number of runs built as a full RunApp. the others are shown as light"
+            " rows (key, long_name and status) and built when expanded, replacing the"
+            " least recently expanded. None builds every run"
+        ),
+    )
+    watch_files: bool = Field(
+        default=False,
+        description=(
+            "watch the input and output files of the runs and update their status when"
+            " they change (e.g. by another user). uses watchdog if installed, otherwise"
+            " polls the files"
+        ),
+    )
+    watch_debounce: float = Field(
+        default=0.5,
+        description="seconds to wait for a burst of file changes to finish",
+    )
+    index_only: bool = Field(
+        default=True,
+        description=(
+            "the batch file stores an index of the runs (key, status, in_batch, folder)"
+            " and each run's config is saved in its own folder, loaded when the run is"
+            " first shown or executed. see ipyrun.runindex"
+        ),
+    )
     # runs: List[Callable] = Field(default=lambda: [], description="a list of RunApps", exclude=True)
 
     # @field_validator("fpth_config")
@@ -857,8 +1429,24 @@ class ConfigBatch(BaseModel):
 
     @field_validator("configs")
     def _configs(cls, v, info: ValidationInfo):
-        """bundles RunApp up as a single argument callable"""
-        return [info.data["cls_config"](**v_) for v_ in v]
+        """index entries are loaded lazily, see ipyrun.runindex"""
+        v = merge_shared(info.data.get("shared_config") or {}, v)
+        with defer_side_effects():
+            return make_configs(v, info.data["cls_config"], info.data["fdir_root"])
+
+    @field_serializer("configs")
+    def _dump_configs(self, v, info):
+        return dump_configs(v, self.index_only, mode=info.mode)
+
+    @model_serializer(mode="wrap")
+    def _share_config(self, handler):
+        data = handler(self)
+        if "configs" in data:
+            shared, configs = {}, data["configs"]
+            if not self.index_only:
+                shared, configs = split_shared(configs)
+            data["shared_config"], data["configs"] = shared, configs
+        return data
 
     @field_validator("status")
     def _status(cls, v, info: ValidationInfo):
@@ -892,6 +1480,7 @@ def fn_add(app, **kwargs):
     app.configs_append(config)
     app.add.value = False
     app.watch_run_statuses()
+    refresh_watch(app)
     app.actions.update_status()
 
 
@@ -912,6 +1501,7 @@ def fn_remove(arg, app=None):
     fdir = [i.fdir_appdata for i in app.config.configs if i.key == key][0]
     app.configs_remove(key)
     app.watch_run_statuses()
+    refresh_watch(app)
     app.actions.update_status()
     shutil.rmtree(fdir)
 
@@ -926,48 +1516,183 @@ def fn_remove_hide(app=None):
 
 
 def check_batch(app, fn_saveconfig, bool_=True):
-    [setattr(v.check, "value", bool_) for k, v in app.di_runs.items()]
+    with app.hold_updates():
+        [setattr(v.check, "value", bool_) for k, v in app.di_runs.items()]
     [setattr(c, "in_batch", bool_) for c in app.config.configs]
     fn_saveconfig()
 
 
 def run_batch(app=None):
-    run_hide = make_run_hide(app._run_hide)  # button to hide the run console
-    display(run_hide)
+    task = getattr(app, "run_task", None)
+    if task is not None and not task.done():
+        print("batch is already running")
+        return task
     # TODO: add remove run button
     sel = {c.key: c.in_batch for c in app.config.configs}
     if True not in sel.values():
+        display(make_run_hide(app._run_hide))  # button to hide the run console
         print("no runs selected")
+        return
+    app.cancel_event = threading.Event()
+    run_hide = make_run_hide(app._run_hide)  # button to hide the run console
+    if app.config.run_async:  # otherwise the kernel is busy until the batch is done
+        run_cancel = make_run_cancel(app.actions.cancel, tooltip="cancel the batch")
+        display(widgets.HBox([run_hide, run_cancel]))
     else:
-        print("run the following:")
-        [print(k) for k, v in sel.items() if v is True]
-    [
-        v.run() for v in app.run_actions if v.config.in_batch  # display_hide_btn=False
-    ]  # TODO add "hide_button" arg
+        display(run_hide)
+    print("run the following:")
+    [print(k) for k, v in sel.items() if v is True]
+    runs = {}
+    for k, v in app.di_runs.items():
+        if not v.config.in_batch:
+            continue
+        if v.config.update_config_at_runtime:
+            v.config = v.config
+        v.cancel_event = threading.Event()
+        runs[v.config.key] = v
+    log = lambda s: app.out_console.append_stdout(s + "\n")
+
+    def execute(config):
+        # status checked when the run is reached as upstream runs may have changed the inputs
+        run = runs[config.key]
+        if run.actions.get_status() == "up_to_date":
+            return RunResult(key=config.key, status="up_to_date")
+        run.out_console.clear_output()
+        streamer = stream_to_console(run)
+        fn_execute = get_fn_execute(config)
+        snapshot = snapshot_run(config)
+        result = fn_execute(config, on_output=streamer, cancel=run.cancel_event)
+        record_run(config, result, snapshot)
+        streamer.close(fpth_console=result.fpth_console)
+        return result
+
+    def execute_many(configs):
+        # runs sharing a script executed by one process. see ipyrun.runmanifest
+        results = [
+            RunResult(key=c.key, status="up_to_date")
+            for c in configs
+            if runs[c.key].actions.get_status() == "up_to_date"
+        ]
+        todo = [c for c in configs if c.key not in {r.key for r in results}]
+        for c in todo:
+            runs[c.key].out_console.clear_output()
+        for c in list(todo):
+            snapshot = snapshot_run(c)
+            result = restore_run(c, on_output=runs[c.key].out_console.append_stdout)
+            if result is not None:
+                record_run(c, result, snapshot)
+                results.append(result)
+                todo.remove(c)
+        if not todo:
+            return results
+        streamer = stream_to_console(app)
+        fn_execute = get_fn_execute(todo[0], use_run_cache=False)
+        snapshots = {c.key: snapshot_run(c) for c in todo}
+        manifest_results = execute_manifest(
+            todo, on_output=streamer, cancel=app.cancel_event, fn_execute=fn_execute
+        )
+        streamer.close()
+        for c, result in zip(todo, manifest_results):
+            record_run(c, result, snapshots[c.key])
+            runs[result.key].out_console.append_stdout(result.stdout)
+        return results + manifest_results
+
+    def on_complete(result):
+        log(f"{result.key}: {result.status} ({result.duration:.2f}s)")
+        if result.status == "skipped":
+            log(result.stdout)
+        set_status_from_result(runs[result.key], result)
+
+    def _run(on_complete):
+        return execute_dag(
+            [v.actions.config for v in runs.values()],  # i.e. loaded
+            max_workers=app.config.max_workers,
+            fn_execute=execute,
+            on_complete=on_complete,
+            cancel=app.cancel_event,
+            group_by=manifest_group_key,
+            fn_execute_many=execute_many,
+        )
+
+    if not app.config.run_async:
+        batch_result = _run(on_complete)
+        log(batch_result.summary())
+        return batch_result
+
+    async def _run_async():
+        loop = asyncio.get_running_loop()
+        threadsafe = lambda result: loop.call_soon_threadsafe(on_complete, result)
+        batch_result = await loop.run_in_executor(None, _run, threadsafe)
+        await asyncio.sleep(0)  # let the queued on_complete callbacks run first
+        log(batch_result.summary())
+        return batch_result
+
+    app.run_task = schedule(_run_async())
+    return app.run_task
+
+
+def watch_batch(app=None):
+    """updates the status of runs when their files are changed"""
+    watcher = getattr(app, "watcher", None)
+    if watcher is not None:
+        watcher.stop()
+
+    def on_change(keys):
+        for k in keys:
+            if k in app.di_runs:
+                app.di_runs[k].actions.update_status()
+
+    app.watcher = StatusWatcher(
+        app.config.fdir_root,
+        lambda: build_path_map(app.config.configs),
+        on_change,
+        debounce=app.config.watch_debounce,
+    ).start()
+    return app.watcher
+
+
+def refresh_watch(app):
+    watcher = getattr(app, "watcher", None)
+    if watcher is not None:
+        watcher.refresh()
 
 
 def batch_get_status(app=None):
-    st = [a.get_status() for a in app.run_actions]
-    if st is None:
-        st = "error"
-    if len(st) == 0:
-        bst = "no_outputs"
-    else:
-        bst = "error"
-    for s in ["up_to_date", "no_outputs", "outputs_need_updating", "error"]:
-        if s in st:
-            bst = s
-    return bst
+    """derived from the current status of each run. see StatusAggregator"""
+    return app.status_aggregator.status
 
 
 def batch_update_status(app=None):
-    [a.update_status() for a in app.run_actions]
+    """runs using the default status checks are resolved together from a single
+    concurrent scan of their directories (see `scan_batch_status`). the scan timing is
+    kept on `app.last_scan`. runs whose config hasn't been loaded keep their saved
+    status"""
+    # runs not yet loaded keep their saved status, see ipyrun.runindex
+    runs = [r for r in app.di_runs.values() if is_loaded(r.config)]
+    scanned = [
+        r
+        for r in runs
+        if getattr(r.actions.get_status, "func", None)
+        in (get_status, get_status_from_content)
+    ]
+    scan = scan_batch_status([r.actions.config for r in scanned])
+    app.last_scan = scan
+    logging.info(scan.summary())
+    ids_scanned = {id(r) for r in scanned}
+    with app.hold_updates():
+        for r in runs:
+            if id(r) in ids_scanned:
+                key = r.actions.config.key
+                set_status(r, r.actions.save_config, scan.statuses[key])
+            else:
+                r.actions.update_status()
     app.status = app.actions.get_status()
 
 
 def load_dir(app=None, fdir_root=None):
     cl = type(app.config)
     config_batch = cl(fdir_root=fdir_root)
+    flush_configs()
     if config_batch.fpth_config.is_file():
         config_batch = cl(**json.loads(config_batch.fpth_config.read_text()))
     print("loading")
@@ -1010,9 +1735,13 @@ class BatchShellActions(DefaultBatchActions):
 
     @field_validator("save_config")
     def _save_config(cls, v, info: ValidationInfo):
-        return wrapped_partial(
-            info.data["config"].file, info.data["config"].fpth_config
-        )
+        return wrapped_partial(save_batch, info.data["config"])
+
+    @field_validator("watch")
+    def _watch(cls, v, info: ValidationInfo):
+        if info.data["app"] is None or not info.data["config"].watch_files:
+            return None
+        return wrapped_partial(watch_batch, app=info.data["app"])
 
     @field_validator("wizard_show")
     def _wizard_show(cls, v, info: ValidationInfo):
@@ -1067,6 +1796,10 @@ class BatchShellActions(DefaultBatchActions):
     def _run(cls, v, info: ValidationInfo):
         return wrapped_partial(run_batch, app=info.data["app"])
 
+    @field_validator("cancel")
+    def _cancel(cls, v, info: ValidationInfo):
+        return wrapped_partial(cancel_run, app=info.data["app"])
+
     @field_validator("inputs_show")
     def _inputs_show(cls, v, info: ValidationInfo):
         return None
@@ -0,0 +1,417 @@
+"""
+content based run status. when a run succeeds a record of what it was run with is saved
+in its `fdir_appdata`: the hash of every input file, the hash of the `path_run` source,
+the params and the rendered shell command. the outputs are only out-of-date if one of
+these has changed, so re-saving an unchanged input doesn't trigger a re-run.
+
+file hashes are cached against (path, size, mtime_ns), so unchanged files are never
+re-hashed. configs without a record (e.g. run before this existed) fall back to
+comparing modification times (see `ipyrun._utils.get_status`).
+
+for large batches (e.g. on network shares) `scan_batch_status` lists each directory once
+with `os.scandir`, concurrently, and resolves the status of every run from that snapshot
+rather than stat-ing each file of each run in turn.
+
+with early cutoff, outputs that a re-run leaves byte-identical keep their content version
+(hash) and modification time, so runs that consume them are not made out-of-date.
+
+the status of a batch is aggregated from the status transitions of its runs by
+`StatusAggregator`.
+"""
+
+import os
+import time
+import pathlib
+import hashlib
+import threading
+import typing as ty
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from pydantic import Field
+from ipyrun.basemodel import BaseModel
+from ipyrun.runexec import ResourceUsage
+
+CHUNK_SIZE = 2**20
+SCAN_WORKERS = 16  # directory reads are IO bound, so more threads than CPUs
+
+
+class FileState(BaseModel):
+    size: int
+    mtime_ns: int
+    hash: str
+
+
+class HashCache:
+    """maps (path, size, mtime_ns) to the sha256 of the file's content"""
+
+    def __init__(self):
+        self._di = {}
+        self._lock = threading.Lock()
+        self.n_hashed = 0
+
+    def add(self, path, state: FileState):
+        k = (os.path.abspath(str(path)), state.size, state.mtime_ns)
+        with self._lock:
+            self._di[k] = state.hash
+
+    def file_state(self, path, stat=None) -> ty.Optional[FileState]:
+        """the size, mtime and content hash of the file. None if it doesn't exist
+
+        Args:
+            path: file path
+            stat (ty.Tuple[int, int], optional): (size, mtime_ns) if already known
+        """
+        if stat is None:
+            stat = stat_file(path)
+        if stat is None:
+            return None
+        k = (os.path.abspath(str(path)),) + tuple(stat)
+        with self._lock:
+            h = self._di.get(k)
+        if h is None:
+            sha = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    sha.update(chunk)
+            h = sha.hexdigest()
+            with self._lock:
+                self._di[k] = h
+                self.n_hashed += 1
+        return FileState(size=stat[0], mtime_ns=stat[1], hash=h)
+
+    def clear(self):
+        with self._lock:
+            self._di = {}
+
+
+HASH_CACHE = HashCache()
+
+
+def stat_file(path) -> ty.Optional[ty.Tuple[int, int]]:
+    """(size, mtime_ns) of a file. None if it doesn't exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+class FileSnapshot:
+    """the (size, mtime_ns) of every file in the scanned directories. paths outside of
+    them are stat-ed when asked for. also memoizes the hash of path_run sources"""
+
+    def __init__(self):
+        self.stats = {}
+        self.dirs = set()
+        self.path_run_hashes = {}
+        self.scan_time = 0.0
+
+    def stat(self, path) -> ty.Optional[ty.Tuple[int, int]]:
+        p = os.path.abspath(str(path))
+        if os.path.dirname(p) in self.dirs:
+            return self.stats.get(p)
+        return stat_file(p)
+
+    def hash_path_run(self, config, cache: "HashCache" = HASH_CACHE):
+        k = (str(config.path_run), str(config.pythonpath))
+        if k not in self.path_run_hashes:
+            self.path_run_hashes[k] = hash_path_run(config, cache=cache)
+        return self.path_run_hashes[k]
+
+
+def _scandir(fdir: str) -> ty.Dict[str, ty.Tuple[int, int]]:
+    di = {}
+    try:
+        with os.scandir(fdir) as it:
+            for entry in it:
+                try:
+                    if entry.is_file():
+                        st = entry.stat()
+                        di[os.path.join(fdir, entry.name)] = (
+                            st.st_size,
+                            st.st_mtime_ns,
+                        )
+                except OSError:
+                    pass
+    except OSError:
+        pass  # i.e. the dir doesn't exist, so neither do any of its files
+    return di
+
+
+def scan_dirs(fdirs: ty.Iterable, max_workers: int = SCAN_WORKERS) -> FileSnapshot:
+    """lists each directory once, reading them concurrently"""
+    snapshot = FileSnapshot()
+    snapshot.dirs = {os.path.abspath(str(d)) for d in fdirs}
+    start = time.perf_counter()
+    if snapshot.dirs:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for di in pool.map(_scandir, sorted(snapshot.dirs)):
+                snapshot.stats.update(di)
+    snapshot.scan_time = time.perf_counter() - start
+    return snapshot
+
+
+def find_path_run(config) -> ty.Optional[pathlib.Path]:
+    """the source of the script or package that is run"""
+    path_run = pathlib.Path(config.path_run)
+    paths = [path_run]
+    if config.pythonpath is not None:
+        paths.insert(0, pathlib.Path(config.pythonpath) / path_run)
+    for p in paths:
+        if p.exists():
+            return p
+    return None
+
+
+def hash_path_run(config, cache: HashCache = HASH_CACHE) -> ty.Optional[str]:
+    """hash of the script, or of all the python files in the package"""
+    p = find_path_run(config)
+    if p is None:
+        return None
+    if p.is_file():
+        return cache.file_state(p).hash
+    sha = hashlib.sha256()
+    for f in sorted(p.rglob("*.py")):
+        state = cache.file_state(f)
+        if state is not None:
+            sha.update(f"{f.relative_to(p).as_posix()}:{state.hash};".encode())
+    return sha.hexdigest()
+
+
+def file_states(fpths, cache: HashCache) -> ty.Dict[str, FileState]:
+    di = {}
+    for f in fpths or []:
+        state = cache.file_state(f)
+        if state is not None:
+            di[str(f)] = state
+    return di
+
+
+class RunRecord(BaseModel):
+    """what a successful run was executed with"""
+
+    inputs: ty.Dict[str, FileState] = {}
+    outputs: ty.Dict[str, FileState] = Field(
+        {}, description="content version of each output"
+    )
+    path_run: ty.Optional[str] = Field(None, description="hash of the path_run source")
+    params: ty.Dict = {}
+    shell: str = ""
+    resources: ty.Optional[ResourceUsage] = None
+
+    @classmethod
+    def from_config(cls, config, cache: HashCache = HASH_CACHE) -> "RunRecord":
+        return cls(
+            inputs=file_states(config.fpths_inputs, cache),
+            outputs=file_states(config.fpths_outputs, cache),
+            path_run=hash_path_run(config, cache=cache),
+            params=config.params or {},
+            shell=config.shell,
+        )
+
+    @classmethod
+    def read(
+        cls, fpth, cache: HashCache = HASH_CACHE, stat=None
+    ) -> ty.Optional["RunRecord"]:
+        """loads the record and seeds the cache with its file states. records are
+        memoized against the (size, mtime_ns) of the file, passed as `stat` if known.
+        only the latest record of each file is kept"""
+        if stat is None:
+            stat = stat_file(fpth)
+        if stat is None:
+            return None
+        k, stat = os.path.abspath(str(fpth)), tuple(stat)
+        memo = _RECORDS.get(k)
+        if memo is not None and memo[0] == stat:
+            record = memo[1]
+        else:
+            try:
+                record = cls.model_validate_json(pathlib.Path(fpth).read_text())
+            except (OSError, ValueError):
+                return None
+            _RECORDS[k] = (stat, record)
+        for path, state in {**record.inputs, **record.outputs}.items():
+            cache.add(path, state)
+        return record
+
+
+_RECORDS: ty.Dict[str, ty.Tuple[tuple, RunRecord]] = {}  # {fpth: (stat, record)}
+
+
+def early_cutoff(
+    config, before: RunRecord, cache: HashCache = HASH_CACHE
+) -> ty.Dict[str, FileState]:
+    """outputs with the same content as before the run are given back their previous
+    modification time. returns the file states of the outputs after the run"""
+    outputs = {}
+    for f in config.fpths_outputs or []:
+        state = cache.file_state(f)
+        if state is None:
+            continue
+        old = before.outputs.get(str(f))
+        if (
+            old is not None
+            and old.hash == state.hash
+            and old.mtime_ns != state.mtime_ns
+        ):
+            st = os.stat(f)
+            os.utime(f, ns=(st.st_atime_ns, old.mtime_ns))
+            cache.add(f, old)
+            state = old
+        outputs[str(f)] = state
+    return outputs
+
+
+def save_run_record(config, record: RunRecord):
+    if getattr(config, "fpth_runrecord", None) is not None:
+        record.file(config.fpth_runrecord)
+
+
+def get_status_from_mtime(config, snapshot: ty.Optional[FileSnapshot] = None) -> str:
+    """as `ipyrun._utils.get_status`, using the snapshot where possible"""
+    snapshot = snapshot if snapshot is not None else FileSnapshot()
+    if len(config.fpths_inputs) == 0:
+        return "error"
+    stats_out = [snapshot.stat(f) for f in config.fpths_outputs]
+    if None in stats_out:
+        return "no_outputs"
+    stats_in = [snapshot.stat(f) for f in config.fpths_inputs]
+    if None in stats_in:
+        return "error"
+    if max(s[1] for s in stats_in) > max(s[1] for s in stats_out):
+        return "outputs_need_updating"
+    return "up_to_date"
+
+
+def get_status_from_content(
+    config, cache: HashCache = HASH_CACHE, snapshot: ty.Optional[FileSnapshot] = None
+) -> str:
+    """as `ipyrun._utils.get_status` but inputs are compared on content with those
+    recorded when the outputs were made.
+
+    Args:
+        config (ConfigShell): the run
+        cache (HashCache, optional): file hashes
+        snapshot (FileSnapshot, optional): file stats from `scan_dirs`. files not in the
+            snapshot are stat-ed individually
+
+    Returns:
+        str: 'no_outputs', 'outputs_need_updating', 'up_to_date' or 'error'
+    """
+    snapshot = snapshot if snapshot is not None else FileSnapshot()
+    fpths_inputs, fpths_outputs = config.fpths_inputs, config.fpths_outputs
+    if len(fpths_inputs) == 0:
+        return "error"
+    for f in fpths_outputs:
+        if snapshot.stat(f) is None:
+            return "no_outputs"
+    fpth = getattr(config, "fpth_runrecord", None)
+    record = None
+    if fpth is not None:
+        record = RunRecord.read(fpth, cache=cache, stat=snapshot.stat(fpth))
+    if record is None:
+        return get_status_from_mtime(config, snapshot=snapshot)
+    if (
+        record.shell != config.shell
+        or record.params != (config.params or {})
+        or set(record.inputs) != {str(f) for f in fpths_inputs}
+    ):
+        return "outputs_need_updating"
+    for f in fpths_inputs:
+        state = cache.file_state(f, stat=snapshot.stat(f))
+        if state is None or state.hash != record.inputs[str(f)].hash:
+            return "outputs_need_updating"
+    if record.path_run != snapshot.hash_path_run(config, cache=cache):
+        return "outputs_need_updating"
+    return "up_to_date"
+
+
+class BatchStatusScan:
+    """the statuses of many runs resolved from one snapshot of their directories"""
+
+    def __init__(self, statuses, snapshot: FileSnapshot, status_time: float):
+        self.statuses = statuses
+        self.snapshot = snapshot
+        self.status_time = status_time
+
+    @property
+    def scan_time(self) -> float:
+        return self.snapshot.scan_time
+
+    def summary(self) -> str:
+        return (
+            f"status of {len(self.statuses)} runs from {len(self.snapshot.dirs)} dirs"
+            f" ({len(self.snapshot.stats)} files): scan = {self.scan_time:.3f}s,"
+            f" resolve = {self.status_time:.3f}s"
+        )
+
+
+def scan_batch_status(
+    configs: ty.List, cache: HashCache = HASH_CACHE, max_workers: int = SCAN_WORKERS
+) -> BatchStatusScan:
+    """the status of every config, from a concurrent scan of the directories that
+    contain their inputs, outputs and run records"""
+    fdirs = set()
+    for c in configs:
+        fpths = list(c.fpths_inputs or []) + list(c.fpths_outputs or [])
+        if getattr(c, "fpth_runrecord", None) is not None:
+            fpths.append(c.fpth_runrecord)
+        fdirs |= {os.path.dirname(os.path.abspath(str(f))) for f in fpths}
+    snapshot = scan_dirs(fdirs, max_workers=max_workers)
+
+    def status(c):
+        if getattr(c, "status_by_content", False):
+            return get_status_from_content(c, cache=cache, snapshot=snapshot)
+        return get_status_from_mtime(c, snapshot=snapshot)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        statuses = dict(zip([c.key for c in configs], pool.map(status, configs)))
+    return BatchStatusScan(statuses, snapshot, time.perf_counter() - start)
+
+
+# in order of precedence. the batch takes the last of these that any run has
+BATCH_STATUS_PRIORITY = (
+    "up_to_date",
+    "no_outputs",
+    "outputs_need_updating",
+    "cancelled",
+    "timed_out",
+    "error",
+)
+
+
+class StatusAggregator:
+    """the status of a batch, kept up-to-date from the status transitions of its runs.
+    each transition updates a counter, so the batch status is found without looking at
+    every run."""
+
+    def __init__(self, priority: ty.Sequence[str] = BATCH_STATUS_PRIORITY):
+        self.priority = priority
+        self.statuses = {}
+        self.counts = Counter()
+
+    def set(self, key: str, status: str):
+        old = self.statuses.get(key)
+        if old == status:
+            return
+        if old is not None:
+            self.counts[old] -= 1
+        self.statuses[key] = status
+        self.counts[status] += 1
+
+    def remove(self, key: str):
+        old = self.statuses.pop(key, None)
+        if old is not None:
+            self.counts[old] -= 1
+
+    @property
+    def status(self) -> str:
+        if not self.statuses:
+            return "no_outputs"
+        bst = "error"
+        for s in self.priority:
+            if self.counts[s] > 0:
+                bst = s
+        return bst
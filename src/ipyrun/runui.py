@@ -22,6 +22,9 @@ The Actions need to be re-defined to create anytype of functionality.
 # %load_ext lab_black
 
 # +
+import asyncio
+import contextlib
+from collections import OrderedDict, deque
 from markdown import markdown
 
 # object models
@@ -41,6 +44,8 @@ from ipyautoui.custom import FileChooser
 # from this repo
 from ipyrun.actions import RunActions, BatchActions, DefaultRunActions
 from ipyrun._utils import make_dir, del_matching
+from ipyrun.runstatus import StatusAggregator
+from ipyrun.runindex import load_config
 from ipyrun.constants import (
     BUTTON_WIDTH_MIN,
     BUTTON_WIDTH_MEDIUM,
@@ -51,7 +56,42 @@ from ipyrun.constants import ADD, REMOVE, WIZARD, BUTTONBAR_LAYOUT_KWARGS
 
 
 # +
+def style_status(button, status):
+    """styles a status indicator as a single front-end update rather than one per
+    attribute"""
+    with button.hold_sync():
+        for k, v in DI_STATUS_MAP[status].items():
+            if k != "layout":
+                setattr(button, k, v)
+
+
+class LazyOutput:
+    """an Output widget that is created on first use. see UiComponents.close_output"""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        out = widgets.Output()
+        obj.__dict__[self.name] = out  # i.e. found before the descriptor from now on
+        obj._layout_outputs()
+        return out
+
+
 class UiComponents:
+    # output areas are only created when something is shown in them
+    out_help_ui = LazyOutput()
+    out_help_run = LazyOutput()
+    out_help_config = LazyOutput()
+    out_inputs = LazyOutput()
+    out_outputs = LazyOutput()
+    out_runlog = LazyOutput()
+    out_load = LazyOutput()
+    out_upload = LazyOutput()
+    out_console = LazyOutput()
+
     def __init__(
         self,
         di_button_styles=DEFAULT_BUTTON_STYLES,
@@ -106,18 +146,26 @@ class UiComponents:
         self.show = widgets.Button()
         self.hide = widgets.Button()
         self.container = container([widgets.HTML("container")])
-        self.out_help_ui = widgets.Output()
-        self.out_help_run = widgets.Output()
-        self.out_help_config = widgets.Output()
-        self.out_inputs = widgets.Output()
-        self.out_outputs = widgets.Output()
-        self.out_runlog = widgets.Output()
-        self.out_load = widgets.Output()
-        self.out_upload = widgets.Output()
-        self.out_console = widgets.Output()
 
         self.di_button_styles = di_button_styles
 
+    def existing_outputs(self, names):
+        """the output areas that have been created"""
+        return [self.__dict__[k] for k in names if k in self.__dict__]
+
+    def close_output(self, out: widgets.Output):
+        """closes an output area. it is re-created when next used"""
+        for k, v in list(self.__dict__.items()):
+            if v is out and isinstance(getattr(type(self), k, None), LazyOutput):
+                del self.__dict__[k]
+                out.close()
+                self._layout_outputs()
+                return
+
+    def _layout_outputs(self):
+        """places the output areas that exist in their containers"""
+        pass
+
         # self.selector = File
 
 
@@ -252,6 +300,8 @@ class RunActionsUi(UiComponents):
                 widget_button.layout.border = ""
                 hide_action()
                 clear_output()
+        if not widget_button.value:
+            self.close_output(widgets_output)
 
     def _help_ui(self, on_change):
         self._show_hide_output(
@@ -322,10 +372,16 @@ class RunActionsUi(UiComponents):
     def _run(self, on_change):
         with self.out_console:
             clear_output()
-            self.actions.run()
-            # reload outputs
-            self.outputs.value = False
-            self.outputs.value = True
+            run = self.actions.run()
+        if isinstance(run, asyncio.Future):
+            # the run is executing on the event loop. reload outputs when it finishes
+            run.add_done_callback(lambda task: self._reload_outputs())
+        else:
+            self._reload_outputs()
+
+    def _reload_outputs(self):
+        self.outputs.value = False
+        self.outputs.value = True
 
     @property
     def map_actions(self):
@@ -455,25 +511,24 @@ class RunUi(RunActionsUi):
         self._actions = value
         self.update_form()
 
+    def _layout_outputs(self):
+        if not hasattr(self, "layout_out"):
+            return  # i.e. the form hasn't been built yet
+        self.layout_out.children = (
+            [self.out_box_load]
+            + self.existing_outputs(
+                ["out_console", "out_help_ui", "out_help_run", "out_help_config"]
+            )
+            + [self.out_box_main]
+        )
+        self.out_box_main.children = self.existing_outputs(
+            ["out_inputs", "out_outputs", "out_runlog"]
+        )
+        self.out_box_load.children = self.existing_outputs(["out_load"])
+
     def update_form(self):
         """update the form if the actions have changed"""
-        # self._layout_out()
-        self.layout_out.children = [
-            self.out_box_load,
-            self.out_console,
-            self.out_help_ui,
-            self.out_help_run,
-            self.out_help_config,
-            self.out_box_main,
-        ]
-        self.out_box_main.children = [
-            self.out_inputs,
-            self.out_outputs,
-            self.out_runlog,
-        ]
-        self.out_box_load.children = [
-            self.out_load,
-        ]
+        self._layout_outputs()
         self.vbx_main.children = [self.button_bar, self.layout_out]
         self.container.children = [self.vbx_main]
         self.button_bar_left.children = self.get_buttons(
@@ -584,12 +639,7 @@ class RunApp(widgets.HBox, RunUi):
         self._style_status()
 
     def _style_status(self):
-        style = dict(DI_STATUS_MAP[self.status])
-        [
-            setattr(self.status_indicator, k, v)
-            for k, v in style.items()
-            if k != "layout"
-        ]
+        style_status(self.status_indicator, self.status)
 
     def __init__(
         self,
@@ -618,7 +668,9 @@ class RunApp(widgets.HBox, RunUi):
             name = config.long_name
         except:
             name = None
-        self._init_RunUi(run_actions=RunActions(), name=name)  # init default actions
+        if not hasattr(self, "run_form"):  # i.e. not built by RunUi.__init__ via super
+            self._init_RunUi(run_actions=RunActions(), name=name)  # init default actions
+        self.name = name
         self.children = [self.run_form]
         self.cls_actions = cls_actions
         self.config = config  # the setter updates the ui.actions using fn_buildactions. can be updated on the fly
@@ -671,27 +723,20 @@ class BatchActionsUi(RunActionsUi):
         self._init_RunActionsUi(actions, di_button_styles=DEFAULT_BUTTON_STYLES)
         self._update_controls()
 
+    out_add = LazyOutput()
+    out_remove = LazyOutput()
+    out_wizard = LazyOutput()
+
     def _update_objects(self):
         self.add = widgets.ToggleButton(**ADD)
         self.remove = widgets.ToggleButton(**REMOVE)
         self.wizard = widgets.ToggleButton(**WIZARD)
-        self.out_add = widgets.Output()
-        self.out_remove = widgets.Output()
-        self.out_wizard = widgets.Output()
 
     def _update_controls(self):
         self.add.observe(self._add, names="value")
         self.remove.observe(self._remove, names="value")
         self.wizard.observe(self._wizard, names="value")
 
-        self.out_inputs.observe(self._update_out, names="outputs")
-        self.out_outputs.observe(self._update_out, names="outputs")
-        self.out_runlog.observe(self._update_out, names="outputs")
-
-    def _update_out(self, on_change):
-        out = [self.out_inputs, self.out_outputs, self.out_runlog]
-        self.out_box_main.children = [o for o in out if len(o.outputs) > 0]
-
     def _add(self, on_change):
         self._show_hide_output(
             self.out_add, self.add, self.actions.add_show, self.actions.add_hide
@@ -849,8 +894,7 @@ class BatchUi(BatchActionsUi):
         self.check.observe(self.check_all, names="value")
 
     def check_all(self, onchange):
-        for k, v in self.di_runs.items():
-            v.check.value = self.check.value  # TODO: fix
+        self.set_checks(self.check.value)
 
     def update_form(self):
         """update the form if the actions have changed"""
@@ -882,30 +926,26 @@ class BatchUi(BatchActionsUi):
             self.layout_out,
             self.runs,
         ]
-
-        self.layout_out.children = [
-            self.out_box_load,
-            self.out_box_addremove,
-            self.out_console,
-            self.out_help_ui,
-            self.out_help_run,
-            self.out_help_config,
-            self.out_box_main,
-            self.out_upload,
-        ]
-        self.out_box_addremove.children = [
-            self.out_add,
-            self.out_remove,
-            self.out_wizard,
-        ]
-        self.out_box_main.children = [
-            self.out_inputs,
-            self.out_outputs,
-            self.out_runlog,
-        ]
-        self.out_box_load.children = [
-            self.out_load,
-        ]
+        self._layout_outputs()
+
+    def _layout_outputs(self):
+        if not hasattr(self, "layout_out"):
+            return  # i.e. the form hasn't been built yet
+        self.layout_out.children = (
+            [self.out_box_load, self.out_box_addremove]
+            + self.existing_outputs(
+                ["out_console", "out_help_ui", "out_help_run", "out_help_config"]
+            )
+            + [self.out_box_main]
+            + self.existing_outputs(["out_upload"])
+        )
+        self.out_box_addremove.children = self.existing_outputs(
+            ["out_add", "out_remove", "out_wizard"]
+        )
+        self.out_box_main.children = self.existing_outputs(
+            ["out_inputs", "out_outputs", "out_runlog"]
+        )
+        self.out_box_load.children = self.existing_outputs(["out_load"])
 
     def _init_form(self):
         # buttons
@@ -970,6 +1010,114 @@ if __name__ == "__main__":
 
 
 # +
+class ConsoleBuffer:
+    """stands in for the console of a RunPlaceholder. keeps the tail of what is written
+    to it, which is shown in the console of the RunApp if the row is expanded"""
+
+    def __init__(self, maxlen: int = 200):
+        self.lines = deque(maxlen=maxlen)
+
+    def append_stdout(self, text: str):
+        self.lines.append(text)
+
+    def clear_output(self, *args, **kwargs):
+        self.lines.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+def close_widgets(obj):
+    """closes the widget and any widgets held as attributes, freeing their front-end
+    models"""
+    for v in list(vars(obj).values()):
+        if isinstance(v, widgets.Widget) and v is not obj:
+            v.close()
+    obj.close()
+
+
+class RunPlaceholder(widgets.HBox):
+    """a lightweight row of a BatchApp showing the check, status, key and long_name of a
+    run. it has the parts of a RunApp that the batch uses (config, actions, status,
+    check and console) so that runs can be selected, updated and executed without
+    building their widgets. the RunApp is built when the row is expanded"""
+
+    status = traitlets.Unicode(default_value="no_outputs")
+
+    @traitlets.validate("status")
+    def valid_status(self, proposal):
+        if proposal["value"] not in list(DI_STATUS_MAP.keys()):
+            raise ValueError(
+                f"{proposal} must be one of: {str(list(DI_STATUS_MAP.keys()))}"
+            )
+        return proposal["value"]
+
+    @traitlets.observe("status")
+    def _observe_status(self, change):
+        self._style_status()
+
+    def _style_status(self):
+        style_status(self.status_indicator, self.status)
+
+    def __init__(self, config, cls_actions, fn_expand=lambda key: None):
+        super().__init__(layout={"width": "100%"})
+        self.cls_actions = cls_actions
+        self.fn_expand = fn_expand
+        self.out_console = ConsoleBuffer()
+        self.check = widgets.Checkbox(
+            indent=False, tooltip="select run", layout={"width": BUTTON_WIDTH_MIN}
+        )
+        self.status_indicator = widgets.Button(
+            disabled=True, layout={"width": BUTTON_WIDTH_MIN}
+        )
+        self.expand = widgets.Button(
+            icon="chevron-down", tooltip="show run", layout={"width": BUTTON_WIDTH_MIN}
+        )
+        self.label = widgets.HTML()
+        self.children = [self.check, self.status_indicator, self.expand, self.label]
+        self._set_config(config)
+        self._style_status()
+        self.check.observe(self._check, names="value")
+        self.expand.on_click(lambda b: self.fn_expand(self.config.key))
+
+    def _set_config(self, config):
+        self._config = config
+        self._actions = None
+        self.check.value = bool(getattr(config, "in_batch", False))
+        if getattr(config, "status", None) in DI_STATUS_MAP:
+            self.status = config.status
+        long_name = getattr(config, "long_name", "")
+        self.label.value = f"<b>{config.key}</b> {long_name}"
+
+    @property
+    def actions(self):
+        """built on first use, loading the config if it is lazy (see ipyrun.runindex)"""
+        if self._actions is None:
+            self._actions = self.cls_actions(config=load_config(self._config), app=self)
+        return self._actions
+
+    @property
+    def config(self):
+        if self._actions is None:
+            return self._config
+        return self._actions.config
+
+    @config.setter
+    def config(self, value):
+        self._set_config(value)
+        self.actions.save_config()
+        self.actions.update_status()
+
+    def _check(self, on_change):
+        if self.check.value:
+            self.actions.check()
+        else:
+            self.actions.uncheck()
+
+
 class BatchApp(widgets.VBox, BatchUi):
     status = traitlets.Unicode(default_value="no_outputs")  #
 
@@ -986,12 +1134,7 @@ class BatchApp(widgets.VBox, BatchUi):
         self._style_status()
 
     def _style_status(self):
-        style = dict(DI_STATUS_MAP[self.status])
-        [
-            setattr(self.status_indicator, k, v)
-            for k, v in style.items()
-            if k != "layout"
-        ]
+        style_status(self.status_indicator, self.status)
 
     def __init__(
         self,
@@ -1011,6 +1154,13 @@ class BatchApp(widgets.VBox, BatchUi):
         except:
             title = ""
         self.cls_actions = cls_actions
+        self.status_aggregator = StatusAggregator()
+        self.last_scan = None  # timing of the last batch status scan
+        self._watched_runs = {}  # {key: RunApp} with an observer on their status
+        self._watched_keys = {}  # {id(RunApp): key}
+        self._live_runs = OrderedDict()  # keys of RunApps, least recently expanded first
+        self._holding = False  # see hold_updates
+        self._index_changed = False  # see save_index
         self._init_BatchUi(BatchActions(), title)  # runs , fn_add, cls_runs_box
         self.children = [self.batch_form]  # [self.ui.batch_form]
         self.config = config  # the setter updates the ui.actions
@@ -1020,11 +1170,39 @@ class BatchApp(widgets.VBox, BatchUi):
         self.watch_run_statuses()
 
     def _update_batch_status(self, onchange):
-        self.actions.update_status()
+        key = self._watched_keys[id(onchange["owner"])]
+        self.status_aggregator.set(key, onchange["new"])
+        if not self._holding:  # otherwise set once, see hold_updates
+            self.status = self.status_aggregator.status
+        self.save_index()
+
+    def save_index(self, onchange=None):
+        """the batch file holds the status and check of each run (see ipyrun.runindex)
+        but a run only saves its own file, so the batch is re-saved when they change.
+        saving is write-behind (see ipyrun.runsave) so many changes are written once"""
+        if self._holding:
+            self._index_changed = True  # saved once, on exit of hold_updates
+        else:
+            self.actions.save_config()
 
     def watch_run_statuses(self):
-        for k, v in self.di_runs.items():
-            v.observe(self._update_batch_status, "status")
+        """observe the status of runs that have been added (once) and stop observing
+        runs that have been removed"""
+        di_runs = self.di_runs
+        for k, v in list(self._watched_runs.items()):
+            if di_runs.get(k) is not v:
+                v.unobserve(self._update_batch_status, "status")
+                v.check.unobserve(self.save_index, "value")
+                self.status_aggregator.remove(k)
+                del self._watched_runs[k], self._watched_keys[id(v)]
+        for k, v in di_runs.items():
+            if k not in self._watched_runs:
+                v.observe(self._update_batch_status, "status")
+                v.check.observe(self.save_index, "value")
+                self.status_aggregator.set(k, v.status)
+                self._watched_runs[k] = v
+                self._watched_keys[id(v)] = k
+        self.status = self.status_aggregator.status
 
     @property
     def run_actions(self):
@@ -1040,35 +1218,140 @@ class BatchApp(widgets.VBox, BatchUi):
         self.actions = actions
         self.actions.save_config()
         di_widgets = {}
+        self._live_runs = OrderedDict()
         try:
-            for c in self.config.configs:
-                di_widgets[c.key] = self.make_run(c)
+            for n, c in enumerate(self.config.configs):
+                if self.max_live_runs is None or n < self.max_live_runs:
+                    di_widgets[c.key] = self.make_run(c)
+                    self._live_runs[c.key] = None
+                else:
+                    di_widgets[c.key] = self.make_placeholder(c)
         except:
             print("error building runs fron config")
             print(f"self.config == {str(self.config)}")
         self.runs.widgets = di_widgets
         self.update_in_batch()
+        self.watch_run_statuses()
         self.actions.update_status()
         self.actions.get_loaded()
+        if self.actions.watch is not None:
+            self.actions.watch()
 
     def update_in_batch(self):  # TODO: remove config dependent code?
-        for k, v in self.di_runs.items():
-            v.check.value = v.config.in_batch
+        with self.hold_updates():
+            for k, v in self.di_runs.items():
+                v.check.value = v.config.in_batch
+
+    @contextlib.contextmanager
+    def hold_updates(self):
+        """bulk changes to the runs (checks, statuses) made within this context are
+        coalesced: each widget sends a single update to the front end on exit, the
+        batch status is re-evaluated once and the run checkboxes don't each save their
+        config. `config.in_batch` is set from the changed checks on exit and the batch
+        is saved once if a status or check changed (see `save_index`), saving the runs
+        is left to the caller (see `set_checks`). re-entrant"""
+        if self._holding:
+            yield
+            return
+        runs = self.di_runs
+        checks = {k: v.check.value for k, v in runs.items()}
+        self._holding = True
+        try:
+            with contextlib.ExitStack() as stack:
+                stack.enter_context(self.status_indicator.hold_sync())
+                for v in runs.values():
+                    stack.enter_context(v.check.hold_sync())
+                    stack.enter_context(v.status_indicator.hold_sync())
+                    v.check.unobserve(v._check, names="value")
+                    stack.callback(v.check.observe, v._check, names="value")
+                yield
+                for k, v in runs.items():
+                    if v.check.value != checks[k]:
+                        v.config.in_batch = v.check.value
+        finally:
+            self._holding = False
+            self.status = self.status_aggregator.status
+            if self._index_changed:
+                self._index_changed = False
+                self.actions.save_config()
+
+    def set_checks(self, value: bool, keys=None):
+        """checks / unchecks the runs (all if `keys` is None) as one bulk update,
+        saving the batch config once"""
+        runs = {k: v for k, v in self.di_runs.items() if keys is None or k in keys}
+        changed = [v for v in runs.values() if v.config.in_batch != value]
+        with self.hold_updates():
+            for v in runs.values():
+                v.check.value = value
+                v.config.in_batch = value
+        if changed:
+            self.actions.save_config()
 
     def make_run(self, config):
         """builds RunApp from config"""
         # TODO: add try except?
-        return self.config.cls_app(config)
+        return self.config.cls_app(load_config(config))
+
+    @property
+    def max_live_runs(self):
+        """the number of runs shown as a RunApp. None shows all of them"""
+        return getattr(self.config, "max_live_runs", None)
+
+    def make_placeholder(self, config):
+        return RunPlaceholder(
+            config, cls_actions=self.config.cls_actions, fn_expand=self.expand_run
+        )
+
+    def _get_box(self, key):
+        return next(bx for bx in self.runs.boxes if bx.key == key)
+
+    def expand_run(self, key):
+        """replaces the placeholder row with its RunApp. if there are more than
+        `max_live_runs` RunApps the least recently expanded is collapsed"""
+        task = getattr(self, "run_task", None)
+        if task is not None and not task.done():
+            return  # the batch holds on to the rows that it is running
+        box = self._get_box(key)
+        placeholder = box.widget
+        if isinstance(placeholder, RunPlaceholder):
+            run = self.make_run(placeholder.config)
+            run.status = placeholder.status
+            for line in placeholder.out_console.lines:
+                run.out_console.append_stdout(line)
+            box.widget = run
+            close_widgets(placeholder)
+        self._live_runs[key] = None
+        self._live_runs.move_to_end(key)
+        while self.max_live_runs is not None and len(self._live_runs) > max(
+            self.max_live_runs, 1
+        ):
+            self.collapse_run(next(iter(self._live_runs)))
+        self.watch_run_statuses()
+
+    def collapse_run(self, key):
+        """replaces the RunApp with a placeholder row, closing its widgets"""
+        self._live_runs.pop(key, None)
+        box = self._get_box(key)
+        run = box.widget
+        if isinstance(run, RunPlaceholder):
+            return
+        placeholder = self.make_placeholder(run.config)
+        placeholder.status = run.status
+        box.widget = placeholder
+        close_widgets(run)
+        self.watch_run_statuses()
 
     def configs_append(self, config):  # TODO: remove config dependent code?
         self.actions.config.configs.append(config)
         newapp = self.make_run(config)
         self.runs.add_row(new_key=config.key, widget=newapp)
         self.update_in_batch()
+        self.expand_run(config.key)
         self.actions.save_config()
 
     def configs_remove(self, key):  # TODO: remove config dependent code?
         self.config.configs = [c for c in self.config.configs if c.key != key]
+        self._live_runs.pop(key, None)
         self.update_in_batch()
         self.actions.save_config()
 
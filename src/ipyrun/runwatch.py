@@ -0,0 +1,170 @@
+"""
+watches the input and output files of a batch and pushes status updates when they are
+changed (e.g. by another process, user or notebook), rather than waiting for
+`update_status` to be called.
+
+uses `watchdog` (inotify on linux) if it is installed, otherwise the watched paths are
+polled. bursts of changes are coalesced: `on_change` is called once with the keys of
+all the runs affected by changes within the `debounce` window.
+"""
+import os
+import asyncio
+import threading
+import typing as ty
+
+from ipyautoui._utils import check_installed
+from ipyrun.runindex import is_loaded
+
+HAS_WATCHDOG = check_installed("watchdog")
+
+
+def build_path_map(configs: ty.List) -> ty.Dict[str, ty.Set[str]]:
+    """map of absolute path to the keys of the configs that read or write it.
+    configs not yet loaded from the index (see ipyrun.runindex) are skipped: this is
+    called from the watcher thread, which mustn't load (and validate) them. they are
+    picked up by the next refresh once they are loaded"""
+    di = {}
+    for c in configs:
+        if not is_loaded(c):
+            continue
+        for f in list(c.fpths_inputs or []) + list(c.fpths_outputs or []):
+            di.setdefault(os.path.abspath(str(f)), set()).add(c.key)
+    return di
+
+
+def _stat(path: str):
+    try:
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime_ns)
+    except OSError:
+        return None
+
+
+class StatusWatcher:
+    """calls `on_change` with the set of keys whose files have changed.
+
+    Args:
+        fdir_root (str): directory watched (recursively) by watchdog
+        fn_path_map (ty.Callable): returns {absolute path: keys}, see build_path_map.
+            called again when changes are flushed so that added / removed runs are
+            picked up
+        on_change (ty.Callable[[ty.Set[str]], ty.Any]): called with the affected keys
+        debounce (float, optional): seconds to wait for further changes before calling
+            on_change. defaults to 0.5
+        poll_interval (float, optional): seconds between checks when polling. defaults to 2
+        use_polling (bool, optional): poll even if watchdog is installed. defaults to False
+    """
+
+    def __init__(
+        self,
+        fdir_root,
+        fn_path_map: ty.Callable[[], ty.Dict[str, ty.Set[str]]],
+        on_change: ty.Callable[[ty.Set[str]], ty.Any],
+        debounce: float = 0.5,
+        poll_interval: float = 2.0,
+        use_polling: bool = False,
+    ):
+        self.fdir_root = os.path.abspath(str(fdir_root))
+        self.fn_path_map = fn_path_map
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_polling = use_polling or not HAS_WATCHDOG
+        self._path_map = fn_path_map()
+        self._pending = set()
+        self._timer = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._observer = None
+        self._thread = None
+        self._loop = None
+
+    @property
+    def backend(self) -> str:
+        return "polling" if self.use_polling else "watchdog"
+
+    def start(self):
+        try:
+            self._loop = asyncio.get_running_loop()  # e.g. the kernel's loop
+        except RuntimeError:
+            self._loop = None
+        if self.use_polling:
+            self._thread = threading.Thread(target=self._poll, daemon=True)
+            self._thread.start()
+        else:
+            self._start_watchdog()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+    def refresh(self):
+        """re-read the path map, e.g. after runs are added or removed"""
+        self._path_map = self.fn_path_map()
+
+    def notify(self, paths: ty.Iterable[str]):
+        """record changed paths and (re)start the debounce timer"""
+        with self._lock:
+            self._pending.update(os.path.abspath(p) for p in paths)
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self):
+        with self._lock:
+            paths, self._pending, self._timer = self._pending, set(), None
+        if self._stop.is_set():
+            return
+        self.refresh()
+        keys = set()
+        for p in paths:
+            keys |= self._path_map.get(p, set())
+        if not keys:
+            return
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.on_change, keys)
+        else:
+            self.on_change(keys)
+
+    def _poll(self):
+        snapshot = {p: _stat(p) for p in self._path_map}
+        while not self._stop.wait(self.poll_interval):
+            self.refresh()
+            changed = []
+            new = {}
+            for p in self._path_map:
+                new[p] = _stat(p)
+                if p in snapshot and new[p] != snapshot[p]:
+                    changed.append(p)
+            snapshot = new
+            if changed:
+                self.notify(changed)
+
+    def _start_watchdog(self):
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                paths = [event.src_path, getattr(event, "dest_path", "")]
+                paths = [p for p in paths if p and os.path.abspath(p) in watcher._path_map]
+                if paths:
+                    watcher.notify(paths)
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), self.fdir_root, recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
@@ -0,0 +1,436 @@
+"""
+a pool of long-lived python worker processes for executing `python -m <run>` jobs
+without paying for interpreter startup and imports on every run.
+
+each worker imports the modules it is asked to preload once. for every job it forks a
+child that runs the `__main__` of the run package (or the script) with the rendered
+argv using `runpy`, so the child starts with everything already imported. user modules
+loaded from the `pythonpath` are re-imported by the worker when their source changes.
+
+the worker protocol is line based: jobs are sent as json on the worker's stdin, the
+output of the forked child is written to the worker's stdout followed by a marker line
+containing the exit code and resource usage of the child. requires `os.fork`; elsewhere
+`execute_warm` falls back to `execute_shell`.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import atexit
+import runpy
+import importlib
+import importlib.util
+import threading
+import traceback
+import typing as ty
+import subprocess
+
+from ipyrun.runexec import (
+    RunResult,
+    ResourceUsage,
+    _Console,
+    _check_interrupt,
+    _set_outcome,
+    execute_shell,
+    POLL_INTERVAL,
+    KILL_GRACE,
+)
+
+SUPPORTED = hasattr(os, "fork")
+MARKER_READY = "\x1eipyrun-ready"
+MARKER_PID = "\x1eipyrun-pid:"
+MARKER_EXIT = "\x1eipyrun-exit:"
+_WORKER_MAIN = "import sys; from ipyrun.runworkers import worker_main; worker_main(sys.argv[1:])"
+
+
+def parse_python_shell(shell: str) -> ty.Optional[ty.Tuple[ty.List[str], dict]]:
+    """split a rendered shell command of the form `python [flags] -m module args` or
+    `python [flags] script.py args` into the interpreter command and a job.
+    returns None if it is not a python command."""
+    li = shell.split(" ")
+    if not li or "python" not in os.path.basename(li[0]).lower():
+        return None
+    n = 1
+    while n < len(li) and li[n].startswith("-") and li[n] != "-m":
+        n += 1
+    if n == len(li):
+        return None
+    if li[n] == "-m":
+        if n + 1 == len(li):
+            return None
+        job = dict(module=li[n + 1], argv=li[n + 2 :])
+    else:
+        job = dict(path=li[n], argv=li[n + 1 :])
+    return li[:n], job
+
+
+# worker process
+# ------------------------------------------------------------------------------------
+
+
+def _write(s: str):
+    sys.stdout.write(s)
+    sys.stdout.flush()
+
+
+class _ModuleTracker:
+    """records the source mtime of user modules (i.e. those loaded from a job's
+    pythonpath) so that they can be re-imported when they change"""
+
+    def __init__(self):
+        self.roots = set()
+        self.mtimes = {}
+        self.preload = set()
+
+    def _is_user_module(self, module) -> bool:
+        f = getattr(module, "__file__", None)
+        return f is not None and any(
+            os.path.abspath(f).startswith(r) for r in self.roots
+        )
+
+    def record(self):
+        for name, module in list(sys.modules.items()):
+            if name not in self.mtimes and self._is_user_module(module):
+                try:
+                    self.mtimes[name] = os.stat(module.__file__).st_mtime_ns
+                except OSError:
+                    pass
+
+    def is_stale(self) -> bool:
+        for name, mtime in self.mtimes.items():
+            module = sys.modules.get(name)
+            try:
+                if module is None or os.stat(module.__file__).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def reload(self):
+        for name in self.mtimes:
+            sys.modules.pop(name, None)
+        self.mtimes = {}
+        importlib.invalidate_caches()
+        _import(self.preload)
+        self.record()
+
+
+def _import(modules):
+    for m in modules:
+        try:
+            importlib.import_module(m)
+        except Exception:
+            pass  # the error is reported when the job imports it
+
+
+def _parent_packages(module: ty.Optional[str]) -> ty.List[str]:
+    """the packages runpy imports before executing `module` as __main__. importing
+    these in the worker is safe, unlike importing the module itself"""
+    if module is None:
+        return []
+    try:
+        spec = importlib.util.find_spec(module)
+    except (ImportError, ValueError):
+        return []
+    if spec is not None and spec.submodule_search_locations is not None:
+        return [module]
+    return [module.rpartition(".")[0]] if "." in module else []
+
+
+def _run_child(job: dict):
+    """runs in the forked child. never returns"""
+    code = 1
+    try:
+        os.setsid()  # own process group so cancelling kills anything it starts
+        _write(f"{MARKER_PID}{os.getpid()}\n")
+        os.chdir(job["cwd"])
+        os.environ.clear()
+        os.environ.update(job["env"])
+        sys.argv = [job.get("module") or job["path"]] + job["argv"]
+        if "module" in job:
+            runpy.run_module(job["module"], run_name="__main__", alter_sys=True)
+        else:
+            sys.path.insert(0, os.path.dirname(os.path.abspath(job["path"])))
+            runpy.run_path(job["path"], run_name="__main__")
+        code = 0
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def worker_main(preload: ty.List[str]):
+    """entry point of a worker process. reads jobs from stdin until it is closed"""
+    sys.stderr = sys.stdout
+    tracker = _ModuleTracker()
+    _import(preload)
+    _write(f"{MARKER_READY}\n")
+    for line in sys.stdin:
+        job = json.loads(line)
+        for p in job["sys_path"]:
+            if p not in sys.path:
+                sys.path.insert(0, p)
+            tracker.roots.add(os.path.abspath(p))
+        if tracker.is_stale():
+            tracker.reload()
+        modules = job["preload"] + _parent_packages(job.get("module"))
+        tracker.preload.update(modules)
+        _import(modules)
+        tracker.record()
+        pid = os.fork()
+        if pid == 0:
+            sys.stdin.close()
+            _run_child(job)
+        _, status, ru = os.wait4(pid, 0)
+        resources = ResourceUsage.from_rusage(ru).model_dump_json()
+        _write(f"{MARKER_EXIT}{os.waitstatus_to_exitcode(status)} {resources}\n")
+
+
+# ipyrun process
+# ------------------------------------------------------------------------------------
+
+
+class WorkerStartError(RuntimeError):
+    """the worker process exited before it was ready to take jobs"""
+
+
+class Worker:
+    """a worker process and the client end of the job protocol
+
+    Raises:
+        WorkerStartError: if the worker process exits before it is ready
+    """
+
+    def __init__(
+        self,
+        interpreter: ty.List[str],
+        preload: ty.List[str],
+        pythonpath: ty.Optional[str] = None,
+    ):
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        if pythonpath:
+            env["PYTHONPATH"] = pythonpath
+        self.proc = subprocess.Popen(
+            interpreter + ["-c", _WORKER_MAIN] + list(preload),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+            bufsize=1,
+            env=env,
+        )
+        output = []
+        for line in self.proc.stdout:
+            if line.rstrip("\n") == MARKER_READY:
+                break
+            output.append(line)
+        else:  # EOF, i.e. the worker died while starting (e.g. importing ipyrun)
+            returncode = self.proc.wait()
+            raise WorkerStartError(
+                f"worker exited with code {returncode} before it was ready:\n"
+                + "".join(output[-20:])
+            )
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def _read_job_output(self, console, state):
+        for line in self.proc.stdout:
+            if line.startswith(MARKER_PID):
+                state["pid"] = int(line[len(MARKER_PID) :])
+                continue
+            before, sep, after = line.partition(MARKER_EXIT)
+            if before:
+                console.write(before)
+            if sep:
+                returncode, _, resources = after.strip().partition(" ")
+                state["returncode"] = int(returncode)
+                if resources:
+                    state["resources"] = ResourceUsage.model_validate_json(resources)
+                return
+
+    def _kill_job(self, state):
+        pid = state["pid"]
+        try:
+            os.killpg(pid, signal.SIGTERM)
+            t = time.time()
+            while "returncode" not in state and time.time() - t < KILL_GRACE:
+                time.sleep(POLL_INTERVAL)
+            if "returncode" not in state:
+                os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def execute(self, job: dict, result: RunResult, console, cancel=None, timeout=None):
+        state = {}
+        self.proc.stdin.write(json.dumps(job) + "\n")
+        self.proc.stdin.flush()
+        reader = threading.Thread(
+            target=self._read_job_output, args=(console, state), daemon=True
+        )
+        reader.start()
+        interrupted, killed = None, False
+        while reader.is_alive():
+            reader.join(timeout=POLL_INTERVAL)
+            if killed or not reader.is_alive():
+                continue
+            if interrupted is None:
+                interrupted = _check_interrupt(result.start, cancel=cancel, timeout=timeout)
+            if interrupted is not None and "pid" in state:
+                self._kill_job(state)
+                killed = True
+        result.resources = state.get("resources")
+        return state.get("returncode"), interrupted
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=KILL_GRACE)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+
+
+class WorkerPool:
+    """idle workers for a given interpreter command and set of preloaded modules.
+    a new worker is started whenever all the existing ones are busy, so concurrency is
+    limited by the caller (e.g. `max_workers` of `execute_batch`)."""
+
+    def __init__(
+        self,
+        interpreter: ty.List[str],
+        preload: ty.List[str],
+        pythonpath: ty.Optional[str] = None,
+    ):
+        self.interpreter = interpreter
+        self.preload = preload
+        self.pythonpath = pythonpath
+        self.workers = []
+        self.idle = queue.SimpleQueue()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Worker:
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                worker = Worker(self.interpreter, self.preload, self.pythonpath)
+                with self._lock:
+                    self.workers.append(worker)
+                return worker
+            if worker.alive:
+                return worker
+
+    def release(self, worker: Worker):
+        if worker.alive:
+            self.idle.put(worker)
+
+    def close(self):
+        with self._lock:
+            for worker in self.workers:
+                worker.close()
+            self.workers = []
+        self.idle = queue.SimpleQueue()
+
+
+_POOLS: ty.Dict[tuple, WorkerPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(
+    interpreter: ty.List[str],
+    preload: ty.List[str],
+    pythonpath: ty.Optional[str] = None,
+) -> WorkerPool:
+    """the pool of workers started with the given interpreter command, preloaded modules
+    and PYTHONPATH"""
+    key = (tuple(interpreter), tuple(sorted(preload)), pythonpath)
+    with _POOLS_LOCK:
+        if key not in _POOLS:
+            _POOLS[key] = WorkerPool(interpreter, sorted(preload), pythonpath)
+        return _POOLS[key]
+
+
+def shutdown_workers():
+    """stop all the worker processes"""
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.close()
+        _POOLS.clear()
+
+
+atexit.register(shutdown_workers)
+
+
+def execute_warm(
+    config,
+    on_output: ty.Optional[ty.Callable[[str], ty.Any]] = None,
+    cancel: ty.Optional[threading.Event] = None,
+) -> RunResult:
+    """as `execute_shell` but `config.shell` is executed in a forked child of a warm
+    worker process that has already imported `config.preload_modules`. falls back to
+    `execute_shell` if `os.fork` is unavailable, the shell isn't a python command or
+    the worker fails to start.
+
+    Args:
+        config (ConfigShell): requires `key`, `shell` and `pythonpath` attributes
+        on_output (ty.Callable, optional): called with each line of output. see OutputStreamer
+        cancel (threading.Event, optional): set to kill the process
+
+    Returns:
+        RunResult
+    """
+    parsed = parse_python_shell(config.shell) if SUPPORTED else None
+    if parsed is None:
+        return execute_shell(config, on_output=on_output, cancel=cancel)
+    interpreter, job = parsed
+    preload = list(getattr(config, "preload_modules", None) or [])
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    sys_path = []
+    if config.pythonpath is not None:
+        pythonpath = os.path.abspath(str(config.pythonpath))
+        sys_path.append(pythonpath)
+        env["PYTHONPATH"] = os.pathsep.join(
+            [p for p in [env.get("PYTHONPATH"), pythonpath] if p]
+        )
+    job.update(cwd=os.getcwd(), env=env, sys_path=sys_path, preload=preload)
+
+    pool = get_pool(interpreter, preload, env.get("PYTHONPATH"))
+    try:
+        worker = pool.acquire()
+    except (WorkerStartError, OSError):
+        return execute_shell(config, on_output=on_output, cancel=cancel)
+    fpth_console = getattr(config, "fpth_console", None)
+    # i.e. not including starting a new worker
+    result = RunResult(key=config.key, start=time.time(), fpth_console=fpth_console)
+    console = _Console(fpth_console, on_output)
+    try:
+        returncode, interrupted = worker.execute(
+            job, result, console, cancel=cancel, timeout=getattr(config, "timeout", None)
+        )
+    finally:
+        pool.release(worker)
+    if returncode is None and interrupted is None:
+        console.write("\nworker process exited unexpectedly\n")
+    _set_outcome(result, console, returncode, interrupted)
+    result.stdout = console.close()
+    result.end = time.time()
+    return result
+
+
+if __name__ == "__main__":
+    worker_main(sys.argv[1:])
@@ -0,0 +1,76 @@
+"""Tests for `ipyrun.runcache`."""
+
+import os
+import sys
+
+from ipyrun.runshell import ConfigShell, get_fn_execute
+from ipyrun.runcache import RunCache, cache_key
+
+SCRIPT_COPY = """\
+import sys
+import pathlib
+print("executed")
+pathlib.Path(sys.argv[2]).write_text(pathlib.Path(sys.argv[1]).read_text() * 2)
+"""
+
+
+def make_config(tmp_path, name="a", **kwargs):
+    script = tmp_path / "script.py"
+    script.write_text(SCRIPT_COPY)
+    fdir = tmp_path / name
+    fdir.mkdir(exist_ok=True)
+    fpth_in, fpth_out = fdir / "in.txt", fdir / "out.txt"
+    if not fpth_in.exists():
+        fpth_in.write_text("x")
+    return ConfigShell(
+        key=name,
+        path_run=script,
+        shell=f"{sys.executable} {script} {fpth_in} {fpth_out}",
+        fpths_inputs=[fpth_in],
+        fpths_outputs=[fpth_out],
+        use_run_cache=True,
+        fdir_run_cache=tmp_path / "cache",
+        **kwargs,
+    )
+
+
+def test_execute_cached(tmp_path):
+    config = make_config(tmp_path)
+    fn_execute = get_fn_execute(config)
+    result = fn_execute(config)
+    assert not result.cached and "executed" in result.stdout
+
+    config.fpths_inputs[0].write_text("y")
+    assert fn_execute(config).stdout.startswith("executed")
+    config.fpths_inputs[0].write_text("x")  # reverted
+    config.fpths_outputs[0].unlink()
+    result = fn_execute(config)
+    assert result.cached and result.status == "success"
+    assert config.fpths_outputs[0].read_text() == "xx"
+
+    other = make_config(tmp_path, name="b")  # identical inputs in another folder
+    assert cache_key(other) == cache_key(config)
+    assert fn_execute(other).cached
+    assert other.fpths_outputs[0].read_text() == "xx"
+    other.params = {"n": 1}
+    assert cache_key(other) != cache_key(config)
+
+
+def test_run_cache_link_and_evict(tmp_path):
+    cache = RunCache(tmp_path / "cache", max_bytes=10, link=True)
+    fpths = []
+    for n in range(3):
+        fpth = tmp_path / f"out-{n}.txt"
+        fpth.write_text("12345")
+        fpths.append(fpth)
+    cache.store("aa1", [fpths[0]])
+    cache.store("aa2", [fpths[1]])
+    assert cache.restore("aa1", [tmp_path / "restored.txt"])  # aa1 now most recent
+    assert os.stat(tmp_path / "restored.txt").st_nlink == 2
+    os.utime(cache._fdir_entry("aa2") / "entry.json", (0, 0))
+    cache.store("aa3", [fpths[2]])
+    assert [k for _, _, k in cache.entries()] == ["aa1", "aa3"]
+
+    (tmp_path / "restored.txt").write_text("edited")  # edits the cache through the link
+    assert not cache.restore("aa1", [tmp_path / "restored.txt"])
+    assert cache.get("aa1") is None
@@ -0,0 +1,48 @@
+"""Tests for `ipyrun.rundag`."""
+
+import pytest
+
+from ipyrun.runshell import ConfigShell
+from ipyrun.runexec import RunResult
+from ipyrun.rundag import build_graph, topological_waves, execute_dag
+
+
+def make_configs():
+    return [
+        ConfigShell(key="c", fpths_inputs=["b/out.csv"], fpths_outputs=["c/out.csv"]),
+        ConfigShell(key="a", fpths_inputs=["a/in.json"], fpths_outputs=["a/out.csv"]),
+        ConfigShell(key="b", fpths_inputs=["a/out.csv"], fpths_outputs=["b/out.csv"]),
+        ConfigShell(key="d", fpths_inputs=["d/in.json"], fpths_outputs=["d/out.csv"]),
+        ConfigShell(key="e", fpths_inputs=["e/in.json"], depends_on=["d", "x"]),
+    ]
+
+
+def test_build_graph():
+    graph = build_graph(make_configs())
+    assert graph == {"c": {"b"}, "a": set(), "b": {"a"}, "d": set(), "e": {"d"}}
+    assert topological_waves(graph) == [["a", "d"], ["b", "e"], ["c"]]
+
+
+def test_topological_waves_cycle():
+    with pytest.raises(ValueError):
+        topological_waves({"a": {"b"}, "b": {"a"}, "c": set()})
+
+
+def test_execute_dag_skips_downstream_of_failure():
+    order = []
+
+    def fn_execute(config):
+        order.append(config.key)
+        status = "failed" if config.key == "a" else "success"
+        return RunResult(key=config.key, status=status)
+
+    batch_result = execute_dag(make_configs(), max_workers=2, fn_execute=fn_execute)
+    di = {r.key: r.status for r in batch_result.results}
+    assert sorted(order) == ["a", "d", "e"]
+    assert di == {
+        "a": "failed",
+        "b": "skipped",
+        "c": "skipped",
+        "d": "success",
+        "e": "success",
+    }
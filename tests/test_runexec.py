@@ -0,0 +1,166 @@
+"""Tests for `ipyrun.runexec`."""
+
+import sys
+import time
+import asyncio
+import pathlib
+import threading
+
+from ipyrun.runshell import ConfigShell
+from ipyrun.runexec import (
+    execute_shell,
+    execute_shell_async,
+    execute_batch,
+    schedule,
+    OutputStreamer,
+    BatchResult,
+    RunResult,
+    HAS_WAIT4,
+)
+
+SCRIPT_SLEEP = """\
+import sys
+import time
+time.sleep(float(sys.argv[1]))
+print("slept", sys.argv[1])
+sys.exit(int(sys.argv[2]) if len(sys.argv) > 2 else 0)
+"""
+
+
+def make_config(tmp_path: pathlib.Path, key: str, *args):
+    script = tmp_path / "sleep.py"
+    if not script.is_file():
+        script.write_text(SCRIPT_SLEEP)
+    shell = " ".join([sys.executable, str(script)] + [str(a) for a in args])
+    return ConfigShell(key=key, shell=shell)
+
+
+def test_execute_shell(tmp_path):
+    result = execute_shell(make_config(tmp_path, "a", 0))
+    assert result.ok
+    assert result.returncode == 0
+    assert "slept 0" in result.stdout
+    result = execute_shell(make_config(tmp_path, "b", 0, 3))
+    assert result.status == "failed"
+    assert result.returncode == 3
+
+
+def test_execute_batch_parallel(tmp_path):
+    configs = [make_config(tmp_path, f"{n:02}-sleep", 0.5) for n in range(4)]
+    completed = []
+    batch_result = execute_batch(configs, max_workers=4, on_complete=completed.append)
+    assert sorted(r.key for r in completed) == [c.key for c in configs]
+    assert all(r.ok for r in batch_result.results)
+    assert batch_result.wall_time < batch_result.serial_time * 0.75
+
+
+def test_execute_shell_async(tmp_path):
+    async def main():
+        task = schedule(execute_shell_async(make_config(tmp_path, "a", 0.2)))
+        assert isinstance(task, asyncio.Task)
+        assert not task.done()  # returned immediately, process still running
+        return await task
+
+    result = asyncio.run(main())
+    assert result.ok
+    assert "slept 0.2" in result.stdout
+    if HAS_WAIT4:
+        assert result.resources is not None  # reaped with os.wait4, as execute_shell
+
+
+def test_execute_shell_async_cancel(tmp_path):
+    cancel = threading.Event()
+
+    async def main():
+        task = schedule(
+            execute_shell_async(make_config(tmp_path, "a", 30), cancel=cancel)
+        )
+        await asyncio.sleep(0.5)
+        cancel.set()
+        return await task
+
+    start = time.time()
+    result = asyncio.run(main())
+    assert result.status == "cancelled"
+    assert time.time() - start < 5
+
+
+def test_execute_shell_async_long_line(tmp_path):
+    script = tmp_path / "long.py"
+    script.write_text('print("x" * 2**21)\nprint("done")\n')
+    config = ConfigShell(key="a", shell=f"{sys.executable} {script}")
+    result = asyncio.run(execute_shell_async(config))
+    assert result.ok
+    assert "x" * 2**21 in result.stdout
+    assert "done" in result.stdout
+
+
+def test_output_streamer_rate_limited():
+    sent = []
+    streamer = OutputStreamer(sent.append, interval=10, max_lines=50, n_tail=5)
+    for n in range(10_000):
+        streamer(f"line {n}\n")
+    streamer.close()
+    text = "".join(sent)
+    assert len(sent) <= 4  # 1st line, then buffered until close
+    assert "line 49\n" in text and "line 50\n" not in text
+    assert "9945 lines not shown" in text
+    assert text.endswith("line 9999\n")
+
+
+def test_execute_shell_streams_to_console(tmp_path):
+    config = make_config(tmp_path, "a", 0)
+    config.fpth_console = tmp_path / "console.log"
+    lines = []
+    result = execute_shell(config, on_output=lines.append)
+    assert lines == ["slept 0\n"]
+    assert config.fpth_console.read_text() == "slept 0\n"
+
+
+def test_execute_shell_timeout(tmp_path):
+    config = make_config(tmp_path, "a", 30)
+    config.timeout = 0.5
+    result = execute_shell(config)
+    assert result.status == "timed_out"
+    assert result.duration < 5
+
+
+def test_execute_shell_cancel(tmp_path):
+    cancel = threading.Event()
+    threading.Timer(0.5, cancel.set).start()
+    result = execute_shell(make_config(tmp_path, "a", 30), cancel=cancel)
+    assert result.status == "cancelled"
+    assert result.duration < 5
+
+
+def test_execute_batch_cancel_remaining(tmp_path):
+    cancel = threading.Event()
+    configs = [make_config(tmp_path, f"{n:02}-sleep", 0.1) for n in range(4)]
+
+    def fn_execute(config):
+        cancel.set()  # i.e. user clicks "cancel remaining" during the 1st run
+        return execute_shell(config)
+
+    batch_result = execute_batch(
+        configs, max_workers=1, fn_execute=fn_execute, cancel=cancel
+    )
+    di = {r.key: r.status for r in batch_result.results}
+    assert list(di.values()).count("success") == 1
+    assert list(di.values()).count("skipped") == 3  # i.e. not run, status unchanged
+
+
+def test_resource_usage(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text("x = bytearray(50 * 2**20)\nsum(range(10**6))")
+    config = ConfigShell(key="a", shell=f"{sys.executable} {script}")
+    result = execute_shell(config)
+    assert result.status == "success"
+    assert result.resources.max_rss > 50 * 2**20
+    assert result.resources.cpu_time > 0
+
+    batch_result = BatchResult(results=[result, RunResult(key="b")])
+    assert batch_result.resource_totals().max_rss == result.resources.max_rss
+    assert (
+        batch_result.resource_percentiles()["cpu_time"][50] == result.resources.cpu_time
+    )
+    assert "peak rss" in batch_result.summary()
@@ -0,0 +1,50 @@
+"""Tests for `ipyrun.runhistory`."""
+
+from ipyrun.runshell import ConfigShell
+from ipyrun.runexec import RunResult
+from ipyrun.runhistory import RunLogUi, iter_history, read_history, record_history
+
+
+def test_record_history(tmp_path):
+    fpth_in, fpth_out = tmp_path / "in.json", tmp_path / "out.csv"
+    fpth_in.write_text("{}")
+    fpth_out.write_text("")
+    config = ConfigShell(
+        key="a",
+        fpths_inputs=[fpth_in],
+        fpths_outputs=[fpth_out],
+        fpth_runhistory=tmp_path / "runhistory.csv",
+    )
+    for n in range(25):
+        status = "failed" if n % 5 == 0 else "success"
+        result = RunResult(key="a", status=status, returncode=0, start=n, end=2 * n)
+        record_history(config, result)
+    record_history(config, RunResult(key="a"))  # never started, so not recorded
+
+    rows = list(iter_history(config.fpth_runhistory))
+    assert len(rows) == 25
+    assert rows[-1]["duration"] == "24.000"
+    assert str(fpth_in) in rows[0]["inputs"]
+
+    page, n = read_history(config.fpth_runhistory, page=0, page_size=10)
+    assert n == 25
+    assert [r["duration"] for r in page[:2]] == ["24.000", "23.000"]  # newest first
+    page, n = read_history(config.fpth_runhistory, page=2, page_size=10)
+    assert len(page) == 5
+    assert page[-1]["duration"] == "0.000"
+    page, n = read_history(config.fpth_runhistory, status="failed")
+    assert n == 5
+    page, n = read_history(config.fpth_runhistory, query="24.000")
+    assert n == 1
+
+    ui = RunLogUi(config.fpth_runhistory, page_size=10)
+    assert ui.n_pages == 3
+    ui.older.click()
+    ui.older.click()
+    assert ui.older.disabled
+    ui.status.value = "failed"
+    assert ui.page == 0 and ui.n == 5
+
+
+def test_read_history_missing(tmp_path):
+    assert read_history(tmp_path / "runhistory.csv") == ([], 0)
@@ -0,0 +1,95 @@
+"""Tests for `ipyrun.runindex`."""
+
+import os
+import json
+
+import pytest
+
+from ipyrun.runindex import LazyConfig, INDEX_FIELDS
+from ipyrun.runsave import flush_configs
+from ipyrun.runui import BatchApp, RunApp
+from ipyrun.examples.linegraph.linegraph_app import (
+    LineGraphConfigShell,
+    LineGraphConfigBatch,
+    LineGraphBatchActions,
+)
+
+
+def test_index_only_batch(tmp_path):
+    cb = LineGraphConfigBatch(fdir_root=tmp_path, max_live_runs=2)
+    cb.configs = [LineGraphConfigShell(index=i, fdir_root=tmp_path) for i in range(5)]
+    cb.configs[3].in_batch = True
+    app = BatchApp(cb, cls_actions=LineGraphBatchActions)
+    flush_configs()
+
+    di = json.loads(cb.fpth_config.read_text())
+    assert all(set(c) == set(INDEX_FIELDS) for c in di["configs"])
+    for c in cb.configs:  # the full configs are in the run folders
+        assert json.loads((tmp_path / c.fpth_config).read_text())["key"] == c.key
+
+    loaded = LineGraphConfigBatch(**di)
+    assert all(isinstance(c, LazyConfig) for c in loaded.configs)
+    assert not any(c.loaded for c in loaded.configs)
+    assert loaded.configs[3].in_batch and loaded.configs[3].key == "03-linegraph"
+
+    app = BatchApp(loaded, cls_actions=LineGraphBatchActions)
+    assert [c.loaded for c in loaded.configs] == [True, True, False, False, False]
+    app.check.value = True  # check all, without loading
+    assert [c.loaded for c in loaded.configs] == [True, True, False, False, False]
+
+    app.expand_run("04-linegraph")
+    assert isinstance(app.di_runs["04-linegraph"], RunApp)
+    config = loaded.configs[4]
+    assert config.loaded and config.in_batch  # the index takes precedence
+    assert config.shell == cb.configs[4].shell
+    flush_configs()
+    di = json.loads(cb.fpth_config.read_text())
+    assert all(c["in_batch"] for c in di["configs"])
+
+
+def test_lazy_config_load(tmp_path):
+    config = LineGraphConfigShell(index=0, fdir_root=tmp_path)
+    config.file(tmp_path / config.fpth_config)
+    entry = {k: getattr(config, k) for k in INDEX_FIELDS}
+    lazy = LazyConfig(entry, LineGraphConfigShell, ".")  # i.e. tmp_path
+    os.chdir(tmp_path.parent)
+    assert lazy.load().shell == config.shell  # resolved against fdir_root, not the cwd
+
+    entry = dict(entry, key="missing", fdir_appdata="missing")
+    with pytest.raises(FileNotFoundError):
+        LazyConfig(entry, LineGraphConfigShell, tmp_path).load()
+
+
+def test_index_follows_runs(tmp_path):
+    cb = LineGraphConfigBatch(fdir_root=tmp_path)
+    cb.configs = [LineGraphConfigShell(index=i, fdir_root=tmp_path) for i in range(4)]
+    app = BatchApp(cb, cls_actions=LineGraphBatchActions)
+    flush_configs()
+    app.di_runs["01-linegraph"].check.value = True  # saves the run, and the index
+    flush_configs()
+    reload = lambda: LineGraphConfigBatch(**json.loads(cb.fpth_config.read_text()))
+    assert [c.in_batch for c in reload().configs] == [False, True, False, False]
+
+    app.check.value = True
+    app.actions.run()
+    flush_configs()
+    loaded = reload()
+    loaded.max_live_runs = 1
+    app = BatchApp(loaded, cls_actions=LineGraphBatchActions)
+    assert [v.status for v in app.di_runs.values()] == ["up_to_date"] * 4
+    assert not any(c.loaded for c in loaded.configs[1:])
+    assert app.status == "up_to_date"
+
+
+def test_shared_config(tmp_path):
+    cb = LineGraphConfigBatch(fdir_root=tmp_path, index_only=False)
+    cb.configs = [LineGraphConfigShell(index=i, fdir_root=tmp_path) for i in range(3)]
+    di = json.loads(cb.model_dump_json())
+    assert "shell_template" in di["shared_config"]
+    assert not any("shell_template" in c for c in di["configs"])
+    assert all(c["key"] for c in di["configs"])
+
+    loaded = LineGraphConfigBatch(**di)
+    assert [c.model_dump() for c in loaded.configs] == [
+        c.model_dump() for c in cb.configs
+    ]
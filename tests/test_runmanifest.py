@@ -0,0 +1,86 @@
+"""Tests for `ipyrun.runmanifest`."""
+
+import sys
+
+from ipyrun.runshell import ConfigShell
+from ipyrun.runexec import ResourceUsage, RunResult, execute_batch
+from ipyrun.runmanifest import execute_manifest, manifest_group_key
+
+SCRIPT_MANIFEST = """\
+import sys
+import json
+import pathlib
+
+assert sys.argv[1] == "--manifest"
+manifest = json.loads(pathlib.Path(sys.argv[2]).read_text())
+results = {}
+for run in manifest["runs"]:
+    print(run["key"], run["params"])
+    if run["key"] == "b":
+        results["b"] = {"status": "failed", "message": "b failed"}
+    elif run["key"] != "c":  # i.e. c isn't reported
+        results[run["key"]] = {"status": "success", "duration": 0.1}
+pathlib.Path(manifest["fpth_results"]).write_text(json.dumps(results))
+"""
+
+
+def make_configs(tmp_path, keys):
+    script = tmp_path / "script.py"
+    script.write_text(SCRIPT_MANIFEST)
+    return [
+        ConfigShell(
+            key=k,
+            path_run=script,
+            run=str(script),
+            call=sys.executable,
+            params={"n": n},
+            use_manifest=True,
+        )
+        for n, k in enumerate(keys)
+    ]
+
+
+def test_execute_manifest(tmp_path):
+    lines = []
+    results = execute_manifest(
+        make_configs(tmp_path, ["a", "b", "c"]), on_output=lines.append
+    )
+    assert lines == ["a {'n': 0}\n", "b {'n': 1}\n", "c {'n': 2}\n"]
+    di = {r.key: r for r in results}
+    assert di["a"].status == "success"
+    assert abs(di["a"].duration - 0.1) < 1e-6
+    assert di["b"].status == "failed"
+    assert di["b"].stdout == "b failed"
+    assert di["c"].status == "failed"
+    assert not any(p.name.startswith("ipyrun-manifest-") for p in tmp_path.iterdir())
+
+
+def test_execute_manifest_resources(tmp_path):
+    job = RunResult(key="job", status="success", start=0, end=1)
+    job.resources = ResourceUsage(user_time=3.0, max_rss=2**20, block_out=30)
+    configs = make_configs(tmp_path, ["a", "b", "c"])
+    results = execute_manifest(configs, fn_execute=lambda *args, **kwargs: job)
+    assert [r.resources.user_time for r in results] == [1.0, 1.0, 1.0]
+    assert all(r.resources.max_rss == 2**20 for r in results)  # i.e. of the process
+    assert sum(r.resources.block_out for r in results) == 30
+
+
+def test_execute_batch_groups(tmp_path):
+    configs = make_configs(tmp_path, ["a", "b", "c"])
+    configs.append(ConfigShell(key="d", shell="echo d"))
+    assert manifest_group_key(configs[0]) == manifest_group_key(configs[1])
+    assert manifest_group_key(configs[3]) is None
+    calls = []
+
+    def fn_execute_many(configs):
+        calls.append([c.key for c in configs])
+        return [RunResult(key=c.key, status="success") for c in configs]
+
+    batch_result = execute_batch(
+        configs,
+        fn_execute=lambda c: RunResult(key=c.key, status="success"),
+        group_by=manifest_group_key,
+        fn_execute_many=fn_execute_many,
+    )
+    assert calls == [["a", "b", "c"]]
+    assert sorted(r.key for r in batch_result.results) == ["a", "b", "c", "d"]
@@ -0,0 +1,45 @@
+"""Tests for `ipyrun.runsave`."""
+
+import os
+import json
+import time
+
+from ipyrun.runshell import ConfigShell
+from ipyrun.runsave import ConfigSaver
+
+
+def test_config_saver_coalesces(tmp_path):
+    saver = ConfigSaver(debounce=0.2)
+    config = ConfigShell(key="a")
+    fpth = tmp_path / "config.json"
+    for n in range(10):
+        config.params = {"n": n}
+        saver.save(config, fpth)
+    assert not fpth.exists()  # written behind
+    time.sleep(0.5)
+    assert json.loads(fpth.read_text())["params"] == {"n": 9}
+    assert (saver.n_saves, saver.n_writes) == (10, 1)
+    assert [f.name for f in tmp_path.iterdir()] == ["config.json"]  # no temp files
+
+    mtime = fpth.stat().st_mtime_ns
+    saver.save(config, fpth)
+    saver.flush()
+    assert saver.n_skipped == 1  # unchanged
+    assert fpth.stat().st_mtime_ns == mtime
+
+    fpth.write_text("edited elsewhere")
+    saver.save(config, fpth)
+    saver.flush()
+    assert json.loads(fpth.read_text())["key"] == "a"
+    assert saver.n_writes == 2
+
+
+def test_config_saver_cwd(tmp_path, monkeypatch):
+    saver = ConfigSaver(debounce=0.2)
+    (tmp_path / "a").mkdir(), (tmp_path / "b").mkdir()
+    monkeypatch.chdir(tmp_path / "a")
+    saver.save(ConfigShell(key="a"), "config.json")
+    os.chdir(tmp_path / "b")  # e.g. by a validator of another batch
+    saver.flush()
+    assert (tmp_path / "a" / "config.json").is_file()
+    assert not (tmp_path / "b" / "config.json").exists()
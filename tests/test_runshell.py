@@ -202,3 +202,123 @@ def test_batch_add_run(remake_config):
     app.actions.add()
     assert len(app.config.configs) == n + 1
     assert len(app.runs.children) != 0
+
+
+def test_batch_load_defers_side_effects(tmp_path, monkeypatch):
+    cb = LineGraphConfigBatch(fdir_root=tmp_path, index_only=False)
+    cb.configs = [LineGraphConfigShell(index=i, fdir_root=tmp_path) for i in range(5)]
+    fpths_inputs = [tmp_path / c.fpths_inputs[0] for c in cb.configs]
+    default = fpths_inputs[0].read_text()
+    di = json.loads(cb.model_dump_json())
+    for c in di["configs"]:
+        del c["fpths_inputs"]  # i.e. made by the validator
+    for c in cb.configs:
+        shutil.rmtree(tmp_path / c.fdir_appdata)
+
+    chdirs, _chdir = [], os.chdir
+    monkeypatch.setattr(os, "chdir", lambda p: chdirs.append(p) or _chdir(p))
+    loaded = LineGraphConfigBatch(**di)
+    assert len(chdirs) == 1  # the batch. not once per run
+    assert [c.fpths_inputs for c in loaded.configs] == [c.fpths_inputs for c in cb.configs]
+    assert all(f.read_text() == default for f in fpths_inputs)
+
+
+def test_load_pyobj_cache(tmp_path):
+    from ipyrun.runshell import PyObj, PyObjCache, load_PyObj
+
+    fpth = tmp_path / "schema.py"
+    fpth.write_text("class A:\n    n = 1\n")
+    cache = PyObjCache()
+    obj = PyObj(path=fpth, obj_name="A")
+    a = load_PyObj(obj, cache=cache)
+    assert load_PyObj(obj, cache=cache) is a  # not re-executed
+    assert cache.cache_info() == dict(hits=1, misses=1, size=1)
+
+    fpth.write_text("class A:\n    n = 2\n")
+    os.utime(fpth, ns=(time.time_ns() + 10**9,) * 2)
+    assert load_PyObj(obj, cache=cache).n == 2
+    assert cache.cache_info() == dict(hits=1, misses=2, size=1)
+
+
+def test_renderer_registry(tmp_path):
+    from ipyrun.runshell import RendererRegistry, create_autodisplay_map
+
+    registry = RendererRegistry()
+    configs = [LineGraphConfigShell(index=i, fdir_root=tmp_path) for i in range(3)]
+    saved = []
+    maps = [
+        create_autodisplay_map(
+            c.autodisplay_definitions[0],
+            registry=registry,
+            fns_onsave=[lambda n=n: saved.append(n)],
+        )
+        for n, c in enumerate(configs)
+    ]
+    assert registry.cache_info() == dict(hits=2, misses=1, size=1)
+    ext = configs[0].autodisplay_definitions[0].ext
+    ui = maps[1][ext](tmp_path / configs[1].fpths_inputs[0])
+    assert ui.value == json.loads((tmp_path / configs[1].fpths_inputs[0]).read_text())
+    ui.savebuttonbar.fns_onsave[-1]()  # bound per app
+    assert saved == [1]
+
+
+def test_shell_renderer():
+    from ipyrun.runshell import ShellRenderer, compile_template, template_fields
+
+    text = "{{ call }} {{ run }}{% for f in fpths_inputs %} {{f}}{% endfor %}"
+    assert compile_template(text) is compile_template(text)
+    assert template_fields(text) == {"call", "run", "fpths_inputs"}
+
+    renderer = ShellRenderer(maxsize=2)
+    data = dict(call="python", run="script", fpths_inputs=[pathlib.Path("a.json")])
+    assert renderer.render(text, data) == "python script a.json"
+    assert renderer.render(text, data | dict(index=2)) == "python script a.json"
+    assert renderer.cache_info() == dict(hits=1, misses=1, size=1)  # index not used
+    assert renderer.render(text, data | dict(run="other")) == "python other a.json"
+    renderer.render(text, data | dict(run="third"))
+    assert renderer.cache_info()["size"] == 2
+    assert renderer.render("{{ run }}", dict(run=object())).startswith("<object")
+    assert renderer.cache_info()["size"] == 2  # not serializable, so not cached
+
+
+def test_cancel_run_batch():
+    import threading
+    from types import SimpleNamespace
+    from ipyrun.runshell import cancel_run
+
+    runs = {k: SimpleNamespace(cancel_event=threading.Event()) for k in "ab"}
+    app = SimpleNamespace(cancel_event=threading.Event(), di_runs=runs)
+    cancel_run(app)
+    assert app.cancel_event.is_set()
+    assert all(r.cancel_event.is_set() for r in runs.values())  # i.e. running runs killed
+
+
+def test_run_shell_async_error(tmp_path, monkeypatch):
+    import sys
+    import threading
+    from types import SimpleNamespace
+    import ipywidgets as widgets
+    from ipyrun import runshell
+    from ipyrun.runshell import ConfigShell, run_shell_async
+
+    class Spinner:
+        def __getattr__(self, name):
+            return lambda *args: calls.append(name)
+
+    def record_run(*args):
+        raise OSError("disk full")
+
+    calls, statuses = [], []
+    monkeypatch.setattr(runshell, "_start_run_shell", lambda app, **kwargs: Spinner())
+    monkeypatch.setattr(runshell, "record_run", record_run)
+    app = SimpleNamespace(
+        config=ConfigShell(key="a", shell=f"{sys.executable} -c pass"),
+        cancel_event=threading.Event(),
+        out_console=widgets.Output(),
+        actions=SimpleNamespace(update_status=lambda: statuses.append(1)),
+    )
+    result = run_shell_async(app)  # no running loop, so run to completion
+    assert result.status == "failed"
+    assert calls == ["fail", "stop"]  # i.e. the spinner is stopped
+    assert statuses  # and the status updated
+    assert "disk full" in "".join(o["text"] for o in app.out_console.outputs)
@@ -0,0 +1,220 @@
+"""Tests for `ipyrun.runstatus`."""
+
+import os
+import sys
+import time
+
+from ipyrun.runshell import ConfigShell, BatchApp
+from ipyrun.runstatus import (
+    HashCache,
+    RunRecord,
+    StatusAggregator,
+    get_status_from_content,
+    save_run_record,
+    scan_batch_status,
+)
+from ipyrun._utils import get_status
+from ipyrun.examples.linegraph.linegraph_app import (
+    LineGraphConfigShell,
+    LineGraphConfigBatch,
+    LineGraphBatchActions,
+)
+
+
+def make_config(tmp_path):
+    (tmp_path / "script.py").write_text("print('hello')")
+    fpth_in, fpth_out = tmp_path / "in.json", tmp_path / "out.csv"
+    fpth_in.write_text('{"a": 1}')
+    fpth_out.write_text("a\n1")
+    return ConfigShell(
+        key="a",
+        path_run=tmp_path / "script.py",
+        fpths_inputs=[fpth_in],
+        fpths_outputs=[fpth_out],
+        fpth_runrecord=tmp_path / "runrecord.json",
+        shell="python script.py",
+    )
+
+
+def touch(fpth, text=None):
+    if text is not None:
+        fpth.write_text(text)
+    t = time.time_ns() + 10**9
+    os.utime(fpth, ns=(t, t))
+
+
+def test_get_status_from_content(tmp_path):
+    cache = HashCache()
+    config = make_config(tmp_path)
+    fpth_in = config.fpths_inputs[0]
+    touch(fpth_in)
+    assert get_status_from_content(config, cache=cache) == "outputs_need_updating"
+    save_run_record(config, RunRecord.from_config(config, cache=cache))
+    assert get_status_from_content(config, cache=cache) == "up_to_date"
+
+    touch(fpth_in, '{"a": 1}')  # re-saved but unchanged
+    assert get_status_from_content(config, cache=cache) == "up_to_date"
+    touch(fpth_in, '{"a": 2}')
+    assert get_status_from_content(config, cache=cache) == "outputs_need_updating"
+    touch(fpth_in, '{"a": 1}')
+    assert get_status_from_content(config, cache=cache) == "up_to_date"
+
+    touch(config.path_run, "print('goodbye')")
+    assert get_status_from_content(config, cache=cache) == "outputs_need_updating"
+    touch(config.path_run, "print('hello')")
+    config.params = {"b": 2}
+    assert get_status_from_content(config, cache=cache) == "outputs_need_updating"
+    config.params = {}
+    config.fpths_outputs[0].unlink()
+    assert get_status_from_content(config, cache=cache) == "no_outputs"
+
+
+def test_hash_cache(tmp_path):
+    cache = HashCache()
+    config = make_config(tmp_path)
+    save_run_record(config, RunRecord.from_config(config, cache=cache))
+    n_hashed = cache.n_hashed
+    for n in range(5):
+        assert get_status_from_content(config, cache=cache) == "up_to_date"
+    assert cache.n_hashed == n_hashed
+
+    cache = HashCache()  # i.e. a new kernel. seeded from the record, so no re-hashing
+    get_status_from_content(config, cache=cache)
+    assert cache.n_hashed == 1  # path_run isn't in the record
+
+
+def test_run_record_memo(tmp_path):
+    from ipyrun.runstatus import _RECORDS
+
+    config = make_config(tmp_path)
+    for n in range(3):
+        config.params = {"n": n}
+        save_run_record(config, RunRecord.from_config(config))
+        touch(config.fpth_runrecord)
+        assert RunRecord.read(config.fpth_runrecord).params == {"n": n}
+    assert RunRecord.read(config.fpth_runrecord) is RunRecord.read(
+        config.fpth_runrecord
+    )
+    assert [k for k in _RECORDS if k.startswith(str(tmp_path))] == [
+        str(config.fpth_runrecord)
+    ]  # i.e. only the latest record is kept
+
+
+def test_status_aggregator():
+    agg = StatusAggregator()
+    assert agg.status == "no_outputs"
+    agg.set("a", "up_to_date")
+    agg.set("b", "up_to_date")
+    assert agg.status == "up_to_date"
+    agg.set("b", "outputs_need_updating")
+    assert agg.status == "outputs_need_updating"
+    agg.set("b", "up_to_date")
+    assert agg.status == "up_to_date"
+    agg.set("c", "error")
+    assert agg.status == "error"
+    agg.remove("c")
+    assert agg.status == "up_to_date"
+
+
+def test_batch_status_incremental(tmp_path, monkeypatch):
+    cb = LineGraphConfigBatch(fdir_root=tmp_path)
+    cb.configs = [LineGraphConfigShell(index=n, fdir_root=tmp_path) for n in range(5)]
+    app = BatchApp(cb, cls_actions=LineGraphBatchActions)
+    assert app.status == "no_outputs"
+    n_reads = []
+    monkeypatch.setattr(
+        RunRecord, "read", classmethod(lambda *args, **kwargs: n_reads.append(1))
+    )
+    app.di_runs["02-linegraph"].status = "outputs_need_updating"
+    assert app.status == "outputs_need_updating"
+    assert n_reads == []  # other runs are not re-checked
+    app.di_runs["02-linegraph"].status = "no_outputs"
+    assert app.status == "no_outputs"
+
+
+def test_scan_batch_status(tmp_path, monkeypatch):
+    configs = []
+    for k in ["a", "b", "c"]:
+        fdir = tmp_path / k
+        fdir.mkdir()
+        config = make_config(fdir)
+        config.key = k
+        configs.append(config)
+    save_run_record(configs[0], RunRecord.from_config(configs[0]))
+    configs[0].status_by_content = True
+    configs[1].fpths_outputs[0].unlink()
+    touch(configs[2].fpths_inputs[0])
+    configs[2].status_by_content = False
+
+    stats, _stat = [], os.stat
+    monkeypatch.setattr(
+        os, "stat", lambda p, **kwargs: stats.append(str(p)) or _stat(p, **kwargs)
+    )
+    scan = scan_batch_status(configs)
+    monkeypatch.undo()
+    fpths = {str(f) for c in configs for f in c.fpths_inputs + c.fpths_outputs}
+    assert not fpths & set(stats)  # all from the scan
+    assert scan.statuses == {
+        "a": "up_to_date",
+        "b": "no_outputs",
+        "c": "outputs_need_updating",
+    }
+    for c in configs[1:]:
+        assert scan.statuses[c.key] == get_status(c.fpths_inputs, c.fpths_outputs)
+    assert len(scan.snapshot.dirs) == 3
+    assert "3 runs" in scan.summary()
+
+
+def test_batch_update_status_scan(tmp_path):
+    cb = LineGraphConfigBatch(fdir_root=tmp_path)
+    cb.configs = [LineGraphConfigShell(index=n, fdir_root=tmp_path) for n in range(3)]
+    app = BatchApp(cb, cls_actions=LineGraphBatchActions)
+    app.actions.update_status()
+    assert app.last_scan is not None
+    assert set(app.last_scan.statuses) == set(app.di_runs)
+    assert app.status == "no_outputs"
+
+
+def test_early_cutoff(tmp_path):
+    from ipyrun.runshell import snapshot_run, record_run
+    from ipyrun.runexec import execute_shell
+
+    script = tmp_path / "script.py"
+    script.write_text(
+        "import sys, pathlib\npathlib.Path(sys.argv[1]).write_text('same')"
+    )
+    fpth_in, fpth_mid, fpth_out = [
+        tmp_path / f for f in ["in.txt", "mid.txt", "out.txt"]
+    ]
+    fpth_in.write_text("1")
+    a = ConfigShell(
+        key="a",
+        path_run=script,
+        shell=f"{sys.executable} {script} {fpth_mid}",
+        fpths_inputs=[fpth_in],
+        fpths_outputs=[fpth_mid],
+        fpth_runrecord=tmp_path / "runrecord.json",
+        early_cutoff=True,
+    )
+    b = ConfigShell(key="b", fpths_inputs=[fpth_mid], fpths_outputs=[fpth_out])
+
+    def run(config):
+        snapshot = snapshot_run(config)
+        record_run(config, execute_shell(config), snapshot)
+
+    run(a)
+    fpth_out.write_text("")
+    assert get_status(b.fpths_inputs, b.fpths_outputs) == "up_to_date"
+    mtime_ns = fpth_mid.stat().st_mtime_ns
+
+    touch(fpth_in, "2")
+    assert get_status_from_content(a) == "outputs_need_updating"
+    run(a)  # output unchanged, so keeps its mtime
+    assert fpth_mid.stat().st_mtime_ns == mtime_ns
+    assert get_status_from_content(a) == "up_to_date"
+    assert get_status(b.fpths_inputs, b.fpths_outputs) == "up_to_date"
+
+    a.early_cutoff = False
+    touch(fpth_in, "3")
+    run(a)
+    assert get_status(b.fpths_inputs, b.fpths_outputs) == "outputs_need_updating"
@@ -0,0 +1,104 @@
+"""Tests for `ipyrun.runui`."""
+
+from ipywidgets import Output, Widget
+from ipywidgets.widgets.widget import _instances
+
+from ipyrun import runsave
+from ipyrun.runsave import flush_configs
+from ipyrun.runui import BatchApp, RunApp, RunPlaceholder
+from ipyrun.examples.linegraph.linegraph_app import (
+    LineGraphConfigShell,
+    LineGraphConfigBatch,
+    LineGraphBatchActions,
+)
+
+
+def make_batch(tmp_path, n, **kwargs):
+    cb = LineGraphConfigBatch(fdir_root=tmp_path, **kwargs)
+    cb.configs = [LineGraphConfigShell(index=i, fdir_root=tmp_path) for i in range(n)]
+    return BatchApp(cb, cls_actions=LineGraphBatchActions)
+
+
+def test_lazy_runs(tmp_path):
+    n_widgets = len(_instances)
+    app = make_batch(tmp_path, 6, max_live_runs=2)
+    n_lazy = len(_instances) - n_widgets
+    keys = list(app.di_runs)
+    assert [type(v) for v in app.di_runs.values()] == [RunApp] * 2 + [RunPlaceholder] * 4
+    assert app.status == "no_outputs"
+
+    app.di_runs[keys[4]].expand.click()
+    assert isinstance(app.di_runs[keys[4]], RunApp)
+    assert isinstance(app.di_runs[keys[0]], RunPlaceholder)  # least recently expanded
+    assert sum(isinstance(v, RunApp) for v in app.di_runs.values()) == 2
+
+    placeholder = app.di_runs[keys[5]]
+    placeholder.status = "error"  # the batch status follows placeholders too
+    assert app.status == "error"
+    placeholder.check.value = False
+    assert not app.config.configs[5].in_batch
+
+    n_widgets = len(_instances)
+    make_batch(tmp_path, 6, max_live_runs=None)
+    assert len(_instances) - n_widgets > 1.5 * n_lazy
+
+
+def test_lazy_outputs(tmp_path):
+    cb = LineGraphConfigBatch(fdir_root=tmp_path)
+    config = LineGraphConfigShell(index=0, fdir_root=tmp_path)
+    before = set(_instances)
+    app = cb.cls_app(config)
+    new = [_instances[k] for k in set(_instances) - before]
+    assert not any(isinstance(w, Output) for w in new)
+    assert len(new) < 120
+
+    app.runlog.value = True
+    out = app.out_runlog
+    assert app.out_box_main.children == (out,)
+    app.runlog.value = False
+    assert app.out_box_main.children == ()
+    assert out.comm is None  # closed
+
+
+def test_bulk_updates(tmp_path, monkeypatch):
+    app = make_batch(tmp_path, 6, max_live_runs=3)
+    runs = list(app.di_runs.values())
+    sent, saved = [], []
+    _send = Widget._send
+
+    def send(w, msg, buffers=None):  # i.e. the messages actually sent to the front end
+        sent.append(w)
+        return _send(w, msg, buffers=buffers)
+
+    monkeypatch.setattr(Widget, "_send", send)
+    flush_configs()
+    monkeypatch.setattr(runsave, "write_atomic", lambda p, text: saved.append(p))
+
+    runs[0].status = "error"
+    assert len(sent) == 2  # the run and batch status indicators, all attributes at once
+
+    sent.clear()
+    for v in runs:  # one at a time, the batch status flips with each change
+        v.status = "error"
+        v.status = "outputs_need_updating"
+    n_single = len(sent)
+    for v in runs:
+        v.status = "no_outputs"
+    sent.clear()
+    with app.hold_updates():
+        for v in runs:
+            v.status = "error"
+            v.status = "outputs_need_updating"
+    assert app.status == "outputs_need_updating"
+    assert len(sent) == len(runs) + 1  # one per status indicator
+    assert n_single > 2 * len(sent)
+
+    app.check.value = True
+    flush_configs()
+    sent.clear(), saved.clear()
+    app.check.value = False  # check_all
+    assert not any(c.in_batch for c in app.config.configs)
+    flush_configs()
+    assert len(sent) == len(runs) + 1  # one per checkbox
+    assert saved[0] == str(tmp_path / app.config.fpth_config)  # the batch config, once
+    assert len(saved) == len(set(saved))  # and each run config (see runindex) once
@@ -0,0 +1,61 @@
+"""Tests for `ipyrun.runwatch`."""
+
+import time
+import threading
+
+from ipyrun.runshell import ConfigShell
+from ipyrun.runindex import LazyConfig
+from ipyrun.runwatch import StatusWatcher, build_path_map
+
+
+def make_configs(tmp_path):
+    configs = []
+    for k in ["a", "b", "c"]:
+        fpth_in, fpth_out = tmp_path / f"in-{k}.json", tmp_path / f"out-{k}.csv"
+        fpth_in.write_text("{}")
+        configs.append(ConfigShell(key=k, fpths_inputs=[fpth_in], fpths_outputs=[fpth_out]))
+    configs[2].fpths_inputs.append(tmp_path / "out-a.csv")
+    return configs
+
+
+def test_build_path_map(tmp_path):
+    di = build_path_map(make_configs(tmp_path))
+    assert di[str(tmp_path / "out-a.csv")] == {"a", "c"}
+    assert di[str(tmp_path / "in-b.json")] == {"b"}
+
+
+def test_build_path_map_skips_unloaded(tmp_path):
+    entry = dict(key="d", fdir_appdata="d")
+    lazy = LazyConfig(entry, ConfigShell, tmp_path)
+    di = build_path_map(make_configs(tmp_path) + [lazy])
+    assert "d" not in set().union(*di.values())
+    assert not lazy.loaded
+
+
+def test_status_watcher_debounces(tmp_path):
+    configs = make_configs(tmp_path)
+    calls = []
+    done = threading.Event()
+
+    def on_change(keys):
+        calls.append(keys)
+        done.set()
+
+    watcher = StatusWatcher(
+        tmp_path,
+        lambda: build_path_map(configs),
+        on_change,
+        debounce=0.3,
+        poll_interval=0.05,
+        use_polling=True,
+    ).start()
+    try:
+        for n in range(5):  # a burst of changes
+            (tmp_path / "out-a.csv").write_text(f"{n}")
+            time.sleep(0.06)
+        (tmp_path / "unwatched.txt").write_text("")
+        assert done.wait(timeout=5)
+        time.sleep(0.5)
+    finally:
+        watcher.stop()
+    assert calls == [{"a", "c"}]
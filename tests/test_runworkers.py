@@ -0,0 +1,118 @@
+"""Tests for `ipyrun.runworkers`."""
+
+import os
+import sys
+import time
+
+import pytest
+
+from ipyrun.runshell import ConfigShell
+from ipyrun.runworkers import (
+    Worker,
+    WorkerStartError,
+    execute_warm,
+    parse_python_shell,
+    shutdown_workers,
+)
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+
+SLOW_IMPORT = """\
+import time
+time.sleep(1)
+VALUE = 1
+"""
+
+MAIN = """\
+import sys
+import time
+from slowpkg.slow import VALUE
+print("value", VALUE, sys.argv[1:])
+time.sleep(float(sys.argv[2]) if len(sys.argv) > 2 else 0)
+sys.exit(int(sys.argv[1]))
+"""
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    # runs are executed in the cwd, which other tests may have removed
+    os.chdir(tmp_path)
+    pkg = tmp_path / "slowpkg"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("")
+    (pkg / "slow.py").write_text(SLOW_IMPORT)
+    (pkg / "__main__.py").write_text(MAIN)
+
+    def _make_config(*args, **kwargs):
+        shell = " ".join(
+            [sys.executable, "-O", "-m", "slowpkg"] + [str(a) for a in args]
+        )
+        return ConfigShell(
+            key="a",
+            shell=shell,
+            pythonpath=tmp_path,
+            use_warm_worker=True,
+            preload_modules=["slowpkg.slow"],
+            **kwargs,
+        )
+
+    yield _make_config
+    shutdown_workers()
+
+
+def test_parse_python_shell():
+    assert parse_python_shell("python -O -m linegraph a b") == (
+        ["python", "-O"],
+        dict(module="linegraph", argv=["a", "b"]),
+    )
+    assert parse_python_shell("python script.py a") == (
+        ["python"],
+        dict(path="script.py", argv=["a"]),
+    )
+    assert parse_python_shell("ls -la") is None
+
+
+def test_execute_warm(make_config):
+    result = execute_warm(make_config(0))  # starts the worker and imports slowpkg.slow
+    assert result.ok
+    assert "value 1 ['0']" in result.stdout
+    assert result.resources is not None  # of the forked child
+    start = time.time()
+    result = execute_warm(make_config(3))
+    assert time.time() - start < 0.9  # no re-import of slowpkg.slow
+    assert result.status == "failed"
+    assert result.returncode == 3
+
+
+def test_execute_warm_reloads_changed_modules(make_config, tmp_path):
+    assert "value 1" in execute_warm(make_config(0)).stdout
+    fpth = tmp_path / "slowpkg" / "slow.py"
+    fpth.write_text(SLOW_IMPORT.replace("VALUE = 1", "VALUE = 2"))
+    os.utime(fpth, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert "value 2" in execute_warm(make_config(0)).stdout
+
+
+def test_execute_warm_timeout(make_config):
+    result = execute_warm(make_config(0, 30, timeout=0.5))
+    assert result.status == "timed_out"
+    assert result.duration < 5
+    assert execute_warm(make_config(0)).ok  # the worker survives
+
+
+def test_worker_start_error(tmp_path):
+    with pytest.raises(WorkerStartError):
+        Worker([sys.executable, "-c", "print('broken'); raise SystemExit(3)"], [])
+    os.chdir(tmp_path)
+    (tmp_path / "crash.py").write_text("import os\nos._exit(3)\n")
+    (tmp_path / "script.py").write_text("print('ran')\n")
+    config = ConfigShell(
+        key="a",
+        shell=f"{sys.executable} script.py",
+        pythonpath=tmp_path,
+        use_warm_worker=True,
+        preload_modules=["crash"],
+    )
+    result = execute_warm(config)  # falls back to execute_shell
+    assert result.ok
+    assert "ran" in result.stdout
+    shutdown_workers()